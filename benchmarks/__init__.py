@@ -0,0 +1,12 @@
+"""
+benchmarks
+
+End-to-end benchmarks for the fetchai package. The suite runs the public sync
+and async entry points against an in-process mock of the Agentverse search,
+almanac and agents APIs, so no traffic is sent to agentverse.ai.
+
+Usage:
+    python -m benchmarks [OPTIONS]
+
+Run `python -m benchmarks --help` for the full list of options.
+"""
@@ -0,0 +1,159 @@
+import json
+import sys
+
+import click
+
+from benchmarks.harness import compare, format_table, run_async, run_sync
+from benchmarks.mock_agentverse import MockAgentverse
+from benchmarks.scenarios import SCENARIOS
+
+
+@click.command()
+@click.option(
+    "-s",
+    "--scenario",
+    "scenarios",
+    multiple=True,
+    type=click.Choice(sorted(SCENARIOS)),
+    help="Scenario to run, may be repeated [default: all]",
+)
+@click.option(
+    "-n",
+    "--iterations",
+    type=int,
+    default=200,
+    show_default=True,
+    help="Operations per scenario and mode",
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    type=int,
+    default=8,
+    show_default=True,
+    help="Operations in flight for the async mode",
+)
+@click.option(
+    "--warmup", type=int, default=10, show_default=True, help="Untimed operations"
+)
+@click.option(
+    "--latency",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Mock server latency per request in seconds",
+)
+@click.option(
+    "--jitter",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Mock server random extra latency in seconds",
+)
+@click.option(
+    "--error-rate",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Fraction of mock server requests that fail",
+)
+@click.option(
+    "--throttle-rate",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Fraction of mock server requests that are throttled with a 429",
+)
+@click.option(
+    "--retry-after",
+    type=float,
+    default=0.05,
+    show_default=True,
+    help="Retry-After in seconds sent with throttled responses",
+)
+@click.option("--seed", type=int, default=0, show_default=True, help="Random seed")
+@click.option(
+    "-o", "--output", type=click.Path(), help="Write the results as JSON to this file"
+)
+@click.option(
+    "-b",
+    "--baseline",
+    type=click.Path(exists=True),
+    help="JSON results of a previous run to check for regressions",
+)
+@click.option(
+    "--tolerance",
+    type=float,
+    default=0.25,
+    show_default=True,
+    help="Allowed relative slowdown against the baseline",
+)
+@click.option(
+    "--report-only",
+    is_flag=True,
+    default=False,
+    help="Report regressions against the baseline without failing",
+)
+def main(
+    scenarios,
+    iterations,
+    concurrency,
+    warmup,
+    latency,
+    jitter,
+    error_rate,
+    throttle_rate,
+    retry_after,
+    seed,
+    output,
+    baseline,
+    tolerance,
+    report_only,
+):
+    """Benchmark fetchai against a local mock of the Agentverse APIs."""
+    results = []
+    with MockAgentverse(
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+        retry_after=retry_after,
+        seed=seed,
+    ) as server:
+        for name in scenarios or sorted(SCENARIOS):
+            scenario = SCENARIOS[name](server)
+            results.append(run_sync(name, scenario, iterations, warmup))
+            results.append(run_async(name, scenario, iterations, concurrency, warmup))
+
+    click.echo(format_table(results))
+
+    if output:
+        report = {
+            "config": {
+                "iterations": iterations,
+                "concurrency": concurrency,
+                "latency": latency,
+                "jitter": jitter,
+                "error_rate": error_rate,
+                "throttle_rate": throttle_rate,
+            },
+            "results": {result.key: result.to_dict() for result in results},
+        }
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        click.echo(f"Results saved to {output}")
+
+    if baseline:
+        with open(baseline) as f:
+            previous = json.load(f)["results"]
+        regressions = compare(results, previous, tolerance)
+        for regression in regressions:
+            click.echo(f"Regression: {regression}")
+        if regressions and not report_only:
+            sys.exit(1)
+        if not regressions:
+            click.echo("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
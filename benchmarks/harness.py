@@ -0,0 +1,169 @@
+"""
+harness.py
+
+Timing helpers for the benchmark suite. A scenario is a zero-argument callable
+that performs one operation; the harness runs it either serially on the calling
+thread ("sync") or concurrently from an asyncio event loop backed by a thread
+pool ("async") and reports throughput along with p50/p99 latencies.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+Scenario = Callable[[], object]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of the samples, 0.0 when there are none."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    mode: str
+    operations: int
+    errors: int
+    duration: float
+    latencies: List[float] = field(default_factory=list, repr=False)
+
+    @property
+    def throughput(self) -> float:
+        """Completed operations per second."""
+        if self.duration <= 0:
+            return 0.0
+        return self.operations / self.duration
+
+    @property
+    def p50(self) -> float:
+        return percentile(self.latencies, 50)
+
+    @property
+    def p99(self) -> float:
+        return percentile(self.latencies, 99)
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.mode}]"
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "operations": self.operations,
+            "errors": self.errors,
+            "duration": self.duration,
+            "throughput": self.throughput,
+            "p50": self.p50,
+            "p99": self.p99,
+        }
+
+
+def _timed(scenario: Scenario) -> Tuple[float, bool]:
+    start = time.perf_counter()
+    try:
+        scenario()
+        ok = True
+    except Exception:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run_sync(
+    name: str, scenario: Scenario, iterations: int, warmup: int = 0
+) -> BenchmarkResult:
+    """Run the scenario serially and time every call."""
+    for _ in range(warmup):
+        _timed(scenario)
+
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        elapsed, ok = _timed(scenario)
+        latencies.append(elapsed)
+        errors += 0 if ok else 1
+    duration = time.perf_counter() - start
+
+    return BenchmarkResult(name, "sync", iterations, errors, duration, latencies)
+
+
+def run_async(
+    name: str,
+    scenario: Scenario,
+    iterations: int,
+    concurrency: int,
+    warmup: int = 0,
+) -> BenchmarkResult:
+    """Run the scenario from an asyncio event loop with `concurrency` calls in flight."""
+
+    async def _run() -> BenchmarkResult:
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for _ in range(warmup):
+                await loop.run_in_executor(executor, _timed, scenario)
+
+            start = time.perf_counter()
+            outcomes = await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, _timed, scenario)
+                    for _ in range(iterations)
+                )
+            )
+            duration = time.perf_counter() - start
+
+        latencies = [elapsed for elapsed, _ in outcomes]
+        errors = sum(1 for _, ok in outcomes if not ok)
+        return BenchmarkResult(name, "async", iterations, errors, duration, latencies)
+
+    return asyncio.run(_run())
+
+
+def compare(
+    results: List[BenchmarkResult],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """
+    Compare results against a baseline produced by a previous run.
+    :param results: The results of the current run
+    :param baseline: The "results" mapping of a previous JSON report
+    :param tolerance: The allowed relative slowdown, e.g. 0.25 for 25%
+    :return: A description of every regression found
+    """
+    regressions = []
+    for result in results:
+        previous: Optional[Dict[str, float]] = baseline.get(result.key)
+        if previous is None:
+            continue
+
+        if result.throughput < previous["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{result.key}: throughput {result.throughput:.1f}/s is below "
+                f"baseline {previous['throughput']:.1f}/s"
+            )
+        if result.p99 > previous["p99"] * (1 + tolerance):
+            regressions.append(
+                f"{result.key}: p99 {result.p99 * 1000:.2f}ms is above "
+                f"baseline {previous['p99'] * 1000:.2f}ms"
+            )
+    return regressions
+
+
+def format_table(results: List[BenchmarkResult]) -> str:
+    lines = [
+        f"{'benchmark':<28} {'ops':>7} {'errors':>7} {'ops/s':>10} "
+        f"{'p50 ms':>9} {'p99 ms':>9}"
+    ]
+    for result in results:
+        lines.append(
+            f"{result.key:<28} {result.operations:>7} {result.errors:>7} "
+            f"{result.throughput:>10.1f} {result.p50 * 1000:>9.2f} "
+            f"{result.p99 * 1000:>9.2f}"
+        )
+    return "\n".join(lines)
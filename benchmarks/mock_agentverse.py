@@ -0,0 +1,269 @@
+"""
+mock_agentverse.py
+
+An in-process stand-in for the Agentverse HTTP APIs used by fetchai. It serves
+the search, almanac and agents endpoints, plus a submit endpoint that accepts
+envelopes, from a background thread. Every response can be delayed by a fixed
+latency (plus random jitter), a configurable fraction of requests fail with
+an HTTP 500 and another fraction is throttled with an HTTP 429 and Retry-After,
+which lets the benchmarks exercise both the happy and error paths.
+
+Example:
+    with MockAgentverse(latency=0.005, error_rate=0.01) as server:
+        fetch.ai("Buy me a pair of shoes", search_api=server.search_api)
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set, Tuple
+
+_ALMANAC_AGENT_ROUTE = re.compile(r"^/v1/almanac/agents/(?P<address>[^/]+)$")
+_MAILBOX_AGENT_ROUTE = re.compile(r"^/v1/agents/(?P<address>[^/]+)$")
+
+
+class _MockAgentverseHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so that clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    # responses are written in small pieces, don't let Nagle hold them back
+    disable_nagle_algorithm = True
+
+    server: "_MockAgentverseServer"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def log_message(self, format, *args):
+        # keep the benchmark output clean
+        pass
+
+    def _dispatch(self, method: str):
+        length = int(self.headers.get("content-length") or 0)
+        body = self.rfile.read(length) if length else b""
+        path = self.path.split("?", 1)[0]
+
+        mock = self.server.mock
+        route, status, response = mock.handle(method, path, body)
+        mock.record(route, status)
+
+        delay = mock.latency
+        if mock.jitter:
+            delay += mock.random.uniform(0, mock.jitter)
+        if delay:
+            time.sleep(delay)
+
+        encoded = json.dumps(response).encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header("retry-after", str(mock.retry_after))
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+
+class _MockAgentverseServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # a deep accept backlog keeps concurrent benchmarks from hitting SYN retries
+    request_queue_size = 1024
+    mock: "MockAgentverse"
+
+
+class MockAgentverse:
+    """A local HTTP server that mimics the Agentverse search, almanac and agents APIs."""
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        search_results: int = 10,
+    ):
+        """
+        Create a new mock server. The server is not started until start() is called.
+        :param latency: Fixed delay in seconds added to every response
+        :param jitter: Upper bound in seconds of a uniform random delay added on top of latency
+        :param error_rate: Fraction of requests (0.0 - 1.0) that fail with an HTTP 500
+        :param throttle_rate: Fraction of requests (0.0 - 1.0) that are throttled with an HTTP 429
+        :param retry_after: The Retry-After in seconds sent with throttled responses
+        :param seed: Seed for the random generator driving jitter and errors
+        :param host: The interface to bind to
+        :param port: The port to bind to, 0 picks a free port
+        :param search_results: The number of agents returned by the search endpoint
+        """
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("error_rate must be between 0.0 and 1.0")
+        if not 0.0 <= throttle_rate <= 1.0:
+            raise ValueError("throttle_rate must be between 0.0 and 1.0")
+
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.search_results = search_results
+
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, List[dict]] = {}
+        self._agents: Set[str] = set()
+        self._readmes: Dict[str, str] = {}
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.throttled: Counter = Counter()
+
+        self._server = _MockAgentverseServer((host, port), _MockAgentverseHandler)
+        self._server.mock = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def almanac_api(self) -> str:
+        return f"{self.url}/v1/almanac"
+
+    @property
+    def mailbox_api(self) -> str:
+        return f"{self.url}/v1/agents"
+
+    @property
+    def search_api(self) -> str:
+        return f"{self.url}/v1/search"
+
+    @property
+    def submit_url(self) -> str:
+        return f"{self.url}/submit"
+
+    def start(self) -> "MockAgentverse":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever,
+                name="mock-agentverse",
+                daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "MockAgentverse":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests.clear()
+            self.errors.clear()
+            self.throttled.clear()
+
+    def record(self, route: str, status: int):
+        with self._lock:
+            self.requests[route] += 1
+            if status >= 500:
+                self.errors[route] += 1
+            elif status == 429:
+                self.throttled[route] += 1
+
+    def handle(self, method: str, path: str, body: bytes) -> Tuple[str, int, dict]:
+        """Resolve a request to a (route, status, response body) triple."""
+        if self.throttle_rate and self.random.random() < self.throttle_rate:
+            return "throttled", 429, {"detail": "Too many requests"}
+
+        route, status, response = self._route(method, path, body)
+        if status < 400 and self.error_rate and self.random.random() < self.error_rate:
+            return route, 500, {"error": "injected failure"}
+        return route, status, response
+
+    def _route(self, method: str, path: str, body: bytes) -> Tuple[str, int, dict]:
+        if method == "POST" and path == "/submit":
+            return "submit", 200, {}
+
+        if method == "POST" and path == "/v1/search/agents":
+            return "search", 200, {"agents": self._search(body)}
+
+        if method == "POST" and path == "/v1/almanac/agents":
+            attestation = json.loads(body)
+            with self._lock:
+                self._endpoints[attestation["agent_address"]] = attestation["endpoints"]
+            return "almanac.register", 200, {}
+
+        if method == "POST" and path == "/v1/almanac/agents/batch":
+            attestations = json.loads(body)["attestations"]
+            with self._lock:
+                for attestation in attestations:
+                    self._endpoints[attestation["agent_address"]] = attestation[
+                        "endpoints"
+                    ]
+            return "almanac.register_batch", 200, {}
+
+        match = _ALMANAC_AGENT_ROUTE.match(path)
+        if method == "GET" and match:
+            address = match.group("address")
+            with self._lock:
+                endpoints = self._endpoints.get(address)
+            if endpoints is None:
+                endpoints = [{"url": self.submit_url, "weight": 1}]
+            return "almanac.lookup", 200, {"address": address, "endpoints": endpoints}
+
+        if method == "POST" and path == "/v1/agents/":
+            agent = json.loads(body)
+            with self._lock:
+                self._agents.add(agent["address"])
+            return "agents.create", 200, {"address": agent["address"]}
+
+        match = _MAILBOX_AGENT_ROUTE.match(path)
+        if match:
+            address = match.group("address")
+            if method == "GET":
+                with self._lock:
+                    exists = address in self._agents
+                if not exists:
+                    return "agents.get", 404, {"detail": "Not found"}
+                return "agents.get", 200, {"address": address}
+            if method == "PUT":
+                agent = json.loads(body)
+                with self._lock:
+                    self._readmes[address] = agent.get("readme", "")
+                return "agents.update", 200, {"address": address}
+
+        return "unknown", 404, {"detail": "Not found"}
+
+    def _search(self, body: bytes) -> List[dict]:
+        query = json.loads(body) if body else {}
+        limit = min(query.get("limit", self.search_results), self.search_results)
+        offset = query.get("offset", 0)
+        text = query.get("search_text", "")
+        return [
+            {
+                "name": f"Mock AI {index}",
+                "readme": f"<description>Mock AI {index} for {text}</description>",
+                "address": f"agent1mock{index:055d}",
+            }
+            for index in range(offset, offset + limit)
+        ]
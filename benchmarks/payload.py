@@ -0,0 +1,103 @@
+"""
+payload.py
+
+Measures the bytes-on-wire and CPU trade-off of the payload compression modes
+supported by Envelope.encode_payload. Each document size is encoded and
+decoded with every available mode, reporting the encoded payload size and the
+time spent per operation.
+
+Usage:
+    python -m benchmarks.payload [--repeat N]
+"""
+
+import json
+import time
+from typing import Callable, Optional
+
+import click
+
+from fetchai.communication import Envelope, zstandard
+
+DOCUMENT_SIZES = {
+    "small": 4,
+    "medium": 64,
+    "large": 1024,
+    "huge": 16384,
+}
+
+
+def build_document(records: int) -> str:
+    """A JSON document shaped like typical agent payloads, `records` items long."""
+    return json.dumps(
+        {
+            "query": "List the shoe stores near me",
+            "results": [
+                {
+                    "id": index,
+                    "name": f"Store {index}",
+                    "description": "Sells running shoes, sneakers and boots",
+                    "rating": round(3 + (index % 20) / 10, 1),
+                    "open": index % 3 != 0,
+                }
+                for index in range(records)
+            ],
+        },
+        separators=(",", ":"),
+    )
+
+
+def _time_per_call(fn: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+@click.command()
+@click.option(
+    "-r",
+    "--repeat",
+    type=int,
+    default=200,
+    show_default=True,
+    help="Timed encode/decode calls per measurement",
+)
+def main(repeat):
+    """Compare payload size and encode/decode time per compression mode."""
+    modes = [None, "gzip"] + (["zstd"] if zstandard is not None else [])
+
+    click.echo(
+        f"{'document':<9} {'mode':<5} {'json B':>9} {'wire B':>9} "
+        f"{'ratio':>6} {'encode us':>10} {'decode us':>10}"
+    )
+    for name, records in DOCUMENT_SIZES.items():
+        document = build_document(records)
+        for mode in modes:
+            env = Envelope(
+                version=1,
+                sender="agent1sender",
+                target="agent1target",
+                session="8b3d2ee4-8b55-4f3b-a9b8-5f4e1f0e2c11",
+                schema_digest="model:benchmark",
+            )
+            encode = _time_per_call(
+                lambda: env.encode_payload(document, mode, 0), repeat
+            )
+            decode = _time_per_call(env.decode_payload, repeat)
+            wire = len(env.payload)
+            click.echo(
+                f"{name:<9} {_label(mode):<5} {len(document):>9} {wire:>9} "
+                f"{wire / len(document):>6.2f} {encode * 1e6:>10.1f} "
+                f"{decode * 1e6:>10.1f}"
+            )
+
+    if zstandard is None:
+        click.echo("zstd skipped, install fetchai[zstd] to include it")
+
+
+def _label(mode: Optional[str]) -> str:
+    return mode or "none"
+
+
+if __name__ == "__main__":
+    main()
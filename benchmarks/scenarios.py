@@ -0,0 +1,133 @@
+"""
+scenarios.py
+
+The operations measured by the benchmark suite. Each factory takes a running
+MockAgentverse and returns a zero-argument callable that performs one
+operation through the public fetchai API.
+"""
+
+from typing import Callable, Dict
+from uuid import uuid4
+
+from fetchai import fetch
+from fetchai.communication import (
+    Conversation,
+    _build_envelope,
+    parse_message_from_agent,
+    send_message_to_agent,
+)
+from fetchai.crypto import Identity
+from fetchai.inbound import InboundPipeline, MessageRejected
+from fetchai.registration import register_with_agentverse
+
+from benchmarks.mock_agentverse import MockAgentverse
+
+BENCHMARK_SEED = "fetchai benchmark seed"
+
+BENCHMARK_PAYLOAD = {
+    "question": "Buy me a pair of shoes",
+    "shoe_size": 12,
+    "favorite_color": "black",
+}
+
+BENCHMARK_README = (
+    "<description>Benchmark AI</description>"
+    "<use_cases><use_case>Measure registration</use_case></use_cases>"
+)
+
+
+def message(server: MockAgentverse) -> Callable[[], None]:
+    sender = Identity.from_seed(BENCHMARK_SEED, 0)
+    target = Identity.from_seed(BENCHMARK_SEED, 1).address
+
+    def _send():
+        send_message_to_agent(
+            sender, target, BENCHMARK_PAYLOAD, almanac_api=server.almanac_api
+        )
+
+    return _send
+
+
+def conversation(server: MockAgentverse) -> Callable[[], None]:
+    sender = Identity.from_seed(BENCHMARK_SEED, 0)
+    target = Identity.from_seed(BENCHMARK_SEED, 1).address
+    dialogue = Conversation(sender, target, almanac_api=server.almanac_api)
+
+    def _send():
+        dialogue.send(BENCHMARK_PAYLOAD)
+
+    return _send
+
+
+def _inbound_envelope(target: str) -> str:
+    sender = Identity.from_seed(BENCHMARK_SEED, 0)
+    return _build_envelope(
+        sender,
+        target,
+        BENCHMARK_PAYLOAD,
+        uuid4(),
+        None,
+        "model:708d789bb90924328daa69a47f7a8f3483980f16a1142c24b12972a2e4174bc6",
+    ).model_dump_json()
+
+
+def inbound(server: MockAgentverse) -> Callable[[], None]:
+    content = _inbound_envelope(Identity.from_seed(BENCHMARK_SEED, 1).address)
+
+    def _parse():
+        parse_message_from_agent(content).payload
+
+    return _parse
+
+
+def inbound_rejected(server: MockAgentverse) -> Callable[[], None]:
+    pipeline = InboundPipeline(targets={Identity.from_seed(BENCHMARK_SEED, 1).address})
+    content = _inbound_envelope(Identity.from_seed(BENCHMARK_SEED, 3).address)
+
+    def _reject():
+        try:
+            pipeline.process(content)
+        except MessageRejected:
+            return
+        raise RuntimeError("Envelope for an unknown target was accepted")
+
+    return _reject
+
+
+def registration(server: MockAgentverse) -> Callable[[], None]:
+    identity = Identity.from_seed(BENCHMARK_SEED, 2)
+
+    def _register():
+        register_with_agentverse(
+            identity,
+            server.submit_url,
+            "benchmark-token",
+            "Benchmark AI",
+            BENCHMARK_README,
+            almanac_api=server.almanac_api,
+            mailbox_api=server.mailbox_api,
+        )
+
+    return _register
+
+
+def search(server: MockAgentverse) -> Callable[[], None]:
+    def _search():
+        result = fetch.ai(BENCHMARK_PAYLOAD["question"], search_api=server.search_api)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        # fetch.ai hides HTTP errors of the search API behind an empty result
+        if not result["ais"]:
+            raise RuntimeError("Search returned no agents")
+
+    return _search
+
+
+SCENARIOS: Dict[str, Callable[[MockAgentverse], Callable[[], None]]] = {
+    "conversation": conversation,
+    "inbound": inbound,
+    "inbound_rejected": inbound_rejected,
+    "message": message,
+    "registration": registration,
+    "search": search,
+}
@@ -0,0 +1,111 @@
+"""
+sender.py
+
+Measures sustained outbound throughput of the PipelinedSender against the
+mock Agentverse, in messages per second, for a range of signing pool sizes.
+Sending the same messages one after the other with send_message_to_agent is
+included as the serial baseline.
+
+Usage:
+    python -m benchmarks.sender [--messages N] [--pool-size N ...] [--latency S]
+"""
+
+import os
+import time
+
+import click
+
+from fetchai.communication import send_message_to_agent
+from fetchai.crypto import Identity
+from fetchai.sender import PipelinedSender
+
+from benchmarks.mock_agentverse import MockAgentverse
+from benchmarks.scenarios import BENCHMARK_PAYLOAD, BENCHMARK_SEED
+
+
+def _serial(server: MockAgentverse, sender: Identity, target: str, messages: int):
+    for _ in range(messages):
+        send_message_to_agent(
+            sender, target, BENCHMARK_PAYLOAD, almanac_api=server.almanac_api
+        )
+
+
+def _pipelined(
+    server: MockAgentverse,
+    sender: Identity,
+    target: str,
+    messages: int,
+    pool_size: int,
+    concurrency: int,
+):
+    with PipelinedSender(
+        workers=pool_size,
+        concurrency=concurrency,
+        almanac_api=server.almanac_api,
+    ) as pipeline:
+        futures = [
+            pipeline.submit(sender, target, BENCHMARK_PAYLOAD) for _ in range(messages)
+        ]
+        for future in futures:
+            future.result()
+
+
+@click.command()
+@click.option(
+    "-n",
+    "--messages",
+    type=int,
+    default=2000,
+    show_default=True,
+    help="Messages sent per measurement",
+)
+@click.option(
+    "-p",
+    "--pool-size",
+    "pool_sizes",
+    type=int,
+    multiple=True,
+    help="Signing pool size to measure, may be repeated [default: 1, 2, 4, ... CPUs]",
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    type=int,
+    default=8,
+    show_default=True,
+    help="Envelopes posted at the same time",
+)
+@click.option(
+    "--latency",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Mock server latency per request in seconds",
+)
+def main(messages, pool_sizes, concurrency, latency):
+    """Compare outbound messages per second by signing pool size."""
+    if not pool_sizes:
+        cpus = os.cpu_count() or 1
+        pool_sizes = [1]
+        while pool_sizes[-1] * 2 <= cpus:
+            pool_sizes.append(pool_sizes[-1] * 2)
+
+    sender = Identity.from_seed(BENCHMARK_SEED, 0)
+    target = Identity.from_seed(BENCHMARK_SEED, 1).address
+
+    click.echo(f"{'mode':<12} {'pool':>5} {'messages':>9} {'msg/s':>9}")
+    with MockAgentverse(latency=latency) as server:
+        start = time.perf_counter()
+        _serial(server, sender, target, messages)
+        rate = messages / (time.perf_counter() - start)
+        click.echo(f"{'serial':<12} {'-':>5} {messages:>9} {rate:>9.0f}")
+
+        for pool_size in pool_sizes:
+            start = time.perf_counter()
+            _pipelined(server, sender, target, messages, pool_size, concurrency)
+            rate = messages / (time.perf_counter() - start)
+            click.echo(f"{'pipelined':<12} {pool_size:>5} {messages:>9} {rate:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,14 @@
 from .register import register
 from .identity import identity
 from .readme import readme
+from .almanac import almanac
+from .keys import derive_addresses, generate_identities
 
-__all__ = ["register", "identity", "readme"]
+__all__ = [
+    "register",
+    "identity",
+    "readme",
+    "almanac",
+    "generate_identities",
+    "derive_addresses",
+]
@@ -0,0 +1,99 @@
+import click
+import sys
+
+from fetchai.almanac import (
+    SNAPSHOT_ENV_VAR,
+    build_almanac_snapshot,
+    search_agent_addresses,
+)
+
+"""
+almanac.py
+
+This module provides the 'almanac-snapshot' command, which builds a local snapshot of
+Almanac endpoint records. Processes that set the FETCHAI_ALMANAC_SNAPSHOT environment
+variable to the snapshot file resolve the endpoints of the agents in it without any
+network calls.
+
+Usage:
+    fetchai-cli almanac-snapshot [OPTIONS]
+
+Options:
+    -o, --output PATH        Snapshot file to write [default: almanac.db]
+    -a, --address TEXT       Agent address to include, may be repeated
+    -f, --addresses-file PATH
+                             File with one agent address per line
+    -q, --query TEXT         Include the agents found by this search instead
+    -p, --protocol TEXT      Only include agents supporting this protocol digest
+    --max-agents INTEGER     Stop after this many agents found by the search
+    -w, --max-workers INTEGER
+                             Lookups sent at the same time [default: 8]
+    --help                   Show this message and exit.
+
+Without addresses, the command pages through the agents found by the search API for
+the query and protocol, including every agent if neither is given.
+
+Dependencies:
+    - click: For creating the command-line interface
+    - fetchai.almanac: For fetching and writing the snapshot
+"""
+
+
+@click.command(name="almanac-snapshot")
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False),
+    default="almanac.db",
+    show_default=True,
+    help="Snapshot file to write",
+)
+@click.option(
+    "-a",
+    "--address",
+    "addresses",
+    multiple=True,
+    help="Agent address to include, may be repeated",
+)
+@click.option(
+    "-f",
+    "--addresses-file",
+    type=click.File("r"),
+    help="File with one agent address per line",
+)
+@click.option(
+    "-q", "--query", default="", help="Include the agents found by this search instead"
+)
+@click.option(
+    "-p", "--protocol", help="Only include agents supporting this protocol digest"
+)
+@click.option(
+    "--max-agents", type=int, help="Stop after this many agents found by the search"
+)
+@click.option(
+    "-w",
+    "--max-workers",
+    type=int,
+    default=8,
+    show_default=True,
+    help="Lookups sent at the same time",
+)
+def almanac(
+    output, addresses, addresses_file, query, protocol, max_agents, max_workers
+):
+    """Build a local snapshot of Almanac endpoint records."""
+    addresses = list(addresses)
+    if addresses_file:
+        addresses.extend(line.strip() for line in addresses_file if line.strip())
+
+    if not addresses:
+        addresses = search_agent_addresses(query, protocol, max_agents=max_agents)
+
+    try:
+        count = build_almanac_snapshot(output, addresses, max_workers=max_workers)
+    except Exception as e:
+        click.echo(f"Failed to build almanac snapshot: {e}", err=True)
+        sys.exit(1)
+
+    click.echo(f"Saved {count} agent endpoints to {output}")
+    click.echo(f"Set {SNAPSHOT_ENV_VAR}={output} to look them up from the snapshot")
@@ -0,0 +1,261 @@
+import click
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from mnemonic import Mnemonic
+
+from fetchai.crypto import Identity
+
+"""
+keys.py
+
+This module provides offline bulk key management for the FetchAI CLI tool, for
+provisioning many agents at once without rewriting .env for every key.
+
+Main Components:
+1. generate-identities command: Generates many mnemonic identity keys together with the
+   address of the agent at index 0 of each key.
+2. derive-addresses command: Derives the agent addresses of one or many keys over a range
+   of indices.
+
+Both commands spread the key derivation over a pool of worker processes and write one
+JSON record per line to the output file (or stdout) in a single pass.
+
+Usage:
+    fetchai-cli generate-identities [OPTIONS]
+    fetchai-cli derive-addresses [OPTIONS]
+
+Options of generate-identities:
+    -n, --count INTEGER     Number of identity keys to generate [default: 1]
+    -s, --strength INTEGER  Strength of the mnemonics (128 or 256 bits) [default: 256]
+    -o, --output PATH       JSON-lines file to write [default: stdout]
+    -w, --workers INTEGER   Worker processes [default: number of CPUs]
+    --force                 Overwrite the output file without asking
+    --help                  Show this message and exit.
+
+Options of derive-addresses:
+    -k, --key TEXT          Identity key (mnemonic) to derive from [default: AGENT_KEY]
+    -f, --keys-file PATH    JSON-lines file of generate-identities, or one key per line
+    --start INTEGER         First index to derive [default: 0]
+    --end INTEGER           Last index to derive [default: 0]
+    --private-keys          Include the signing key of every address
+    -o, --output PATH       JSON-lines file to write [default: stdout]
+    -w, --workers INTEGER   Worker processes [default: number of CPUs]
+    --force                 Overwrite the output file without asking
+    --help                  Show this message and exit.
+
+Output files hold secret keys and are created readable by the current user only.
+An existing output file is only overwritten after confirmation or with --force.
+
+Dependencies:
+    - click: For creating the command-line interface
+    - mnemonic: For generating mnemonic phrases
+    - fetchai.crypto: For deriving agent identities
+"""
+
+# Keys are derived in chunks so every task is worth sending to a worker
+CHUNK_SIZE = 64
+
+# Agent indices of a key range from 0 to 255
+MAX_INDEX = 255
+
+
+def _generate_identities(strength: int, count: int) -> List[Dict[str, str]]:
+    """Generate identity keys, runs in a worker process."""
+    mnemo = Mnemonic("english")
+    records = []
+    for _ in range(count):
+        words = mnemo.generate(strength=strength)
+        records.append({"key": words, "address": Identity.from_seed(words, 0).address})
+    return records
+
+
+def _derive_addresses(
+    key_id: int, key: str, start: int, end: int, private_keys: bool
+) -> List[Dict[str, object]]:
+    """Derive the identities of a key over an index range, runs in a worker process."""
+    records = []
+    for index in range(start, end + 1):
+        identity = Identity.from_seed(key, index)
+        record = {"key_id": key_id, "index": index, "address": identity.address}
+        if private_keys:
+            record["private_key"] = identity.private_key
+        records.append(record)
+    return records
+
+
+def _confirm_overwrite(output: Optional[str], force: bool) -> bool:
+    """
+    Whether the output file may be overwritten, asking first if it exists.
+    Aborts the command if the user declines.
+    """
+    if force:
+        return True
+    if output is None or not os.path.exists(output):
+        return False
+    click.confirm(
+        f"{output} already exists. Do you want to overwrite it?",
+        default=False,
+        abort=True,
+    )
+    return True
+
+
+@contextmanager
+def _open_output(output: Optional[str], overwrite: bool) -> Iterator[TextIO]:
+    if output is None:
+        yield sys.stdout
+        return
+    flags = os.O_WRONLY | os.O_CREAT
+    flags |= os.O_TRUNC if overwrite else os.O_EXCL
+    try:
+        fd = os.open(output, flags, 0o600)
+    except FileExistsError:
+        raise click.ClickException(
+            f"{output} already exists, use --force to overwrite it"
+        )
+    if hasattr(os, "fchmod"):
+        # the mode of os.open only applies to new files, not overwritten ones
+        os.fchmod(fd, 0o600)
+    with open(fd, "w") as f:
+        yield f
+
+
+def _write_records(f: TextIO, chunks: Iterator[List[Dict[str, object]]]) -> int:
+    written = 0
+    for records in chunks:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+        written += len(records)
+    return written
+
+
+def _load_keys(keys_file: TextIO) -> List[str]:
+    keys = []
+    for line in keys_file:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            keys.append(json.loads(line)["key"])
+        else:
+            keys.append(line)
+    return keys
+
+
+@click.command(name="generate-identities")
+@click.option(
+    "-n",
+    "--count",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of identity keys to generate",
+)
+@click.option(
+    "-s",
+    "--strength",
+    type=click.Choice(["128", "256"]),
+    default="256",
+    show_default=True,
+    help="Strength of the mnemonics in bits",
+)
+@click.option(
+    "-o", "--output", type=click.Path(dir_okay=False), help="JSON-lines file to write"
+)
+@click.option(
+    "-w", "--workers", type=click.IntRange(min=1), help="Number of worker processes"
+)
+@click.option("--force", is_flag=True, help="Overwrite the output file without asking")
+def generate_identities(count, strength, output, workers, force):
+    """Generate many agent identity keys as mnemonic phrases in one run."""
+    overwrite = _confirm_overwrite(output, force)
+
+    chunks = [CHUNK_SIZE] * (count // CHUNK_SIZE)
+    if count % CHUNK_SIZE:
+        chunks.append(count % CHUNK_SIZE)
+
+    with ProcessPoolExecutor(workers) as executor, _open_output(output, overwrite) as f:
+        written = _write_records(
+            f,
+            executor.map(_generate_identities, [int(strength)] * len(chunks), chunks),
+        )
+
+    if output:
+        click.echo(f"{written} identity keys saved to {output}")
+
+
+@click.command(name="derive-addresses")
+@click.option(
+    "-k",
+    "--key",
+    envvar="AGENT_KEY",
+    help="Identity key (mnemonic) to derive from [default: AGENT_KEY]",
+)
+@click.option(
+    "-f",
+    "--keys-file",
+    type=click.File("r"),
+    help="JSON-lines file of generate-identities, or one key per line",
+)
+@click.option(
+    "--start",
+    type=click.IntRange(0, MAX_INDEX),
+    default=0,
+    show_default=True,
+    help="First index to derive",
+)
+@click.option(
+    "--end",
+    type=click.IntRange(0, MAX_INDEX),
+    default=0,
+    show_default=True,
+    help="Last index to derive",
+)
+@click.option(
+    "--private-keys",
+    is_flag=True,
+    default=False,
+    help="Include the signing key of every address",
+)
+@click.option(
+    "-o", "--output", type=click.Path(dir_okay=False), help="JSON-lines file to write"
+)
+@click.option(
+    "-w", "--workers", type=click.IntRange(min=1), help="Number of worker processes"
+)
+@click.option("--force", is_flag=True, help="Overwrite the output file without asking")
+def derive_addresses(key, keys_file, start, end, private_keys, output, workers, force):
+    """Derive the agent addresses of identity keys over a range of indices."""
+    if end < start:
+        raise click.BadParameter("--end must not be smaller than --start")
+
+    keys = _load_keys(keys_file) if keys_file else [key] if key else []
+    if not keys:
+        click.echo(
+            "Error: provide an identity key with --key, --keys-file or AGENT_KEY."
+        )
+        sys.exit(1)
+    overwrite = _confirm_overwrite(output, force)
+
+    tasks: List[Tuple[int, str, int, int]] = []
+    for key_id, words in enumerate(keys):
+        for chunk_start in range(start, end + 1, CHUNK_SIZE):
+            chunk_end = min(end, chunk_start + CHUNK_SIZE - 1)
+            tasks.append((key_id, words, chunk_start, chunk_end))
+
+    with ProcessPoolExecutor(workers) as executor, _open_output(output, overwrite) as f:
+        written = _write_records(
+            f,
+            executor.map(
+                _derive_addresses,
+                *zip(*tasks),
+                [private_keys] * len(tasks),
+            ),
+        )
+
+    if output:
+        click.echo(f"{written} addresses saved to {output}")
@@ -1,7 +1,16 @@
 import click
-from xml.etree.ElementTree import Element, SubElement, tostring
-from xml.dom.minidom import parseString
+import io
+import json
+import os
 import sys
+from typing import List, Optional, TextIO, Tuple, Union
+
+from pydantic import BaseModel
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
 
 """
 readme.py
@@ -11,36 +20,56 @@ within the FetchAI CLI tool. It offers a command-line interface for creating str
 XML README files and utilities for loading existing README content.
 
 Main Components:
-1. generate-readme command: Generates an XML-formatted README file based on user input.
-2. load_readme function: Utility for loading content from existing README files.
+1. generate-readme command: Generates an XML-formatted README file based on user input
+   or, non-interactively, from a JSON or YAML spec file.
+2. write_readme function: Streams the pretty-printed README XML for a spec.
+3. load_readme function: Utility for loading content from existing README files.
 
 Usage:
     python -m fetchai.cli generate-readme [OPTIONS]
 
 Options:
     -o, --output PATH  Output file for the generated README in XML format [default: README.xml]
+    -s, --spec PATH    JSON or YAML spec to build the README(s) from without prompting
     --help             Show this message and exit.
 
 The README generation process includes:
-1. Prompting the user for AI name, description, use cases, and payload requirements
-2. Creating an XML structure with the provided information
-3. Writing the formatted XML to the specified output file
+1. Prompting the user for AI name, description, use cases, and payload requirements,
+   or reading them from the spec file
+2. Writing the pretty-printed XML with the provided information
+3. Skipping the write when the output file already has the same content
+
+A spec file holds one README spec, or a list of them to generate many README files in
+one run. Every spec in a list needs an "output" path:
+
+    - name: Nike AI
+      output: readmes/nike.xml
+      description: I help with buying Nike shoes
+      use_cases:
+        - Buy new Jordans
+      payload_description: The requirements your AI has for requests
+      payload_requirements:
+        - parameter: question
+          description: The question that you would like this AI work with you to solve
 
 Key Features:
 - Interactive command-line interface for gathering AI information
+- Non-interactive, bulk generation from JSON or YAML spec files
 - Structured XML output for consistent README formatting
 - Support for multiple use cases and payload parameters
-- Pretty-printing of XML for improved readability
+- Pretty-printing of XML for improved readability, written in a single pass
 - Error handling for file operations
 
 Functions:
-    readme(output): Main function for generating the README XML file.
+    readme(output, spec): Main function for generating the README XML file(s).
+    write_readme(spec, stream): Writes the README XML for a spec to a stream.
+    render_readme(spec): Returns the README XML for a spec as a string.
     load_readme(file_path): Utility function to load existing README content.
 
 Dependencies:
     - click: For creating the command-line interface
-    - xml.etree.ElementTree: For creating XML structures
-    - xml.dom.minidom: For pretty-printing XML
+    - pydantic: For validating README specs
+    - PyYAML (optional): For reading YAML spec files
 
 Note: This script assumes that the user has the necessary information about their AI agent
 ready when running the generate-readme command. The generated README.xml file should be
@@ -48,19 +77,117 @@ reviewed and potentially edited for completeness and accuracy after generation.
 """
 
 
-@click.command(name="generate-readme")
-@click.option(
-    "-o",
-    "--output",
-    type=click.Path(),
-    default="README.xml",
-    show_default=True,
-    help="Output file for the generated README in XML format",
-)
-def readme(output):
-    """Generate a README XML file for the AI with user inputs."""
+class PayloadRequirement(BaseModel):
+    parameter: str
+    description: str
+
+
+class ReadmeSpec(BaseModel):
+    name: Optional[str] = None
+    description: str
+    use_cases: List[str] = []
+    payload_description: str = ""
+    payload_requirements: List[PayloadRequirement] = []
+    # Where the README is written, required for specs in a list
+    output: Optional[str] = None
+
+
+# An element is written as either its text or its child elements
+XmlContent = Union[str, List[Tuple[str, "XmlContent"]]]
+
+INDENT = "    "
+
+
+def _escape(text: str) -> str:
+    # line breaks are normalized to \n as an XML parser would
+    return (
+        text.replace("\r\n", "\n")
+        .replace("\r", "\n")
+        .replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+    )
+
+
+def _write_element(write, tag: str, content: XmlContent, depth: int):
+    indent = INDENT * depth
+    if not content:
+        write(f"{indent}<{tag}/>\n")
+    elif isinstance(content, str):
+        write(f"{indent}<{tag}>{_escape(content)}</{tag}>\n")
+    else:
+        write(f"{indent}<{tag}>\n")
+        for child_tag, child_content in content:
+            _write_element(write, child_tag, child_content, depth + 1)
+        write(f"{indent}</{tag}>\n")
+
+
+def write_readme(spec: ReadmeSpec, stream: TextIO):
+    """Write the pretty-printed README XML for the spec to the stream."""
+    stream.write('<?xml version="1.0" ?>\n')
+    _write_element(
+        stream.write,
+        "readme",
+        [
+            ("description", spec.description),
+            ("use_cases", [("use_case", use_case) for use_case in spec.use_cases]),
+            (
+                "payload_requirements",
+                [
+                    ("description", spec.payload_description),
+                    (
+                        "payload",
+                        [
+                            (
+                                "requirement",
+                                [
+                                    ("parameter", requirement.parameter),
+                                    ("description", requirement.description),
+                                ],
+                            )
+                            for requirement in spec.payload_requirements
+                        ],
+                    ),
+                ],
+            ),
+        ],
+        0,
+    )
 
-    # Prompt the user for necessary information
+
+def render_readme(spec: ReadmeSpec) -> str:
+    """Return the pretty-printed README XML for the spec."""
+    buffer = io.StringIO()
+    write_readme(spec, buffer)
+    return buffer.getvalue()
+
+
+def load_readme_specs(file_path: str) -> List[ReadmeSpec]:
+    """Load one or many README specs from a JSON or YAML file."""
+    with open(file_path, "r") as f:
+        if file_path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise click.ClickException(
+                    "PyYAML is required to read YAML specs, install fetchai[yaml]"
+                )
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    if isinstance(data, list):
+        specs = [ReadmeSpec.model_validate(entry) for entry in data]
+        for index, spec in enumerate(specs):
+            if spec.output is None:
+                raise click.ClickException(
+                    f"README spec {index} in {file_path} has no output path"
+                )
+        return specs
+    return [ReadmeSpec.model_validate(data)]
+
+
+def prompt_readme_spec() -> ReadmeSpec:
+    """Prompt the user for the contents of a README."""
     name = click.prompt("Enter the AI's name")
     description = click.prompt(
         "Enter a description of the AI's capabilities and offerings"
@@ -94,45 +221,72 @@ def readme(output):
         parameter_description = click.prompt(
             f"Enter a description for parameter '{parameter}'"
         )
-        payload_requirements.append((parameter, parameter_description))
-
-    # Create XML structure
-    root = Element("readme")
-
-    # Description
-    description_elem = SubElement(root, "description")
-    description_elem.text = description
+        payload_requirements.append(
+            PayloadRequirement(parameter=parameter, description=parameter_description)
+        )
 
-    # Use Cases
-    use_cases_elem = SubElement(root, "use_cases")
-    for use_case in use_cases:
-        use_case_elem = SubElement(use_cases_elem, "use_case")
-        use_case_elem.text = use_case
+    return ReadmeSpec(
+        name=name,
+        description=description,
+        use_cases=use_cases,
+        payload_description=payload_description,
+        payload_requirements=payload_requirements,
+    )
 
-    # Payload Requirements
-    payload_elem = SubElement(root, "payload_requirements")
 
-    payload_desc_elem = SubElement(payload_elem, "description")
-    payload_desc_elem.text = payload_description
+def save_readme(spec: ReadmeSpec, output: str) -> bool:
+    """
+    Write the README for the spec to the output file, unless the file already
+    has the same content.
+    :return: True if the file was written
+    """
+    content = render_readme(spec)
+    try:
+        with open(output, "r") as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
 
-    payload_sub_elem = SubElement(payload_elem, "payload")
-    for parameter, param_desc in payload_requirements:
-        requirement_elem = SubElement(payload_sub_elem, "requirement")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w") as f:
+        f.write(content)
+    return True
 
-        param_elem = SubElement(requirement_elem, "parameter")
-        param_elem.text = parameter
 
-        param_desc_elem = SubElement(requirement_elem, "description")
-        param_desc_elem.text = param_desc
+@click.command(name="generate-readme")
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(),
+    default="README.xml",
+    show_default=True,
+    help="Output file for the generated README in XML format",
+)
+@click.option(
+    "-s",
+    "--spec",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON or YAML spec to build the README(s) from without prompting",
+)
+def readme(output, spec):
+    """Generate a README XML file for the AI with user inputs or from a spec file."""
+    specs = load_readme_specs(spec) if spec else [prompt_readme_spec()]
 
-    # Convert to a pretty XML string
-    raw_xml = tostring(root, "utf-8")
-    pretty_xml = parseString(raw_xml).toprettyxml(indent="    ")
+    for readme_spec in specs:
+        path = readme_spec.output or output
+        try:
+            written = save_readme(readme_spec, path)
+        except IOError as err:
+            click.echo(f"Error: Unable to write README file at {path}: {err}")
+            sys.exit(1)
 
-    # Write to output file
-    with open(output, "w") as f:
-        f.write(pretty_xml)
-    click.echo(f"README generated and saved to {output}")
+        if written:
+            click.echo(f"README generated and saved to {path}")
+        else:
+            click.echo(f"README at {path} is unchanged")
 
 
 # Utility function to load README content
@@ -1,4 +1,5 @@
 import click
+import os
 import sys
 from dotenv import set_key
 from fetchai.crypto import Identity
@@ -23,15 +24,17 @@ Options:
     -n, --name TEXT     Name of the AI (required, prompted if not provided)
     -r, --readme TEXT   Path to README file (required, prompted if not provided)
     -w, --webhook TEXT  Webhook URL for the AI (required, prompted if not provided)
-    -f, --force         Force registration even if agent is already registered
+    -f, --force         Force registration even if agent is already registered,
+                        re-uploading an unchanged README
     --help              Show this message and exit.
 
 The registration process includes:
 1. Loading environment variables (AgentVerse key and agent key)
 2. Reading the content of the provided README file
 3. Creating an AI identity using the agent key
-4. Registering the agent with AgentVerse
-5. Saving the AI identity and name to a .env file
+4. Registering the agent with AgentVerse, skipping the README upload when the name and
+   README match the digest saved by the previous registration
+5. Saving the AI identity, name and README digest to a .env file
 
 If any errors occur during the registration process, they will be displayed
 and the program will exit with a non-zero status code.
@@ -86,15 +89,28 @@ def register(name, readme, webhook, force):
         # Create AI identity
         ai_identity = Identity.from_seed(agent_key, 0)
 
+        # The README digest saved by the last registration of this identity
+        previous_digest = None
+        if not force and os.getenv("AI_IDENTITY") == ai_identity.address:
+            previous_digest = os.getenv("AI_README_DIGEST")
+
         # Register the agent with Agentverse
         result = register_with_agentverse(
-            ai_identity, webhook, agentverse_key, name, readme_content
+            ai_identity,
+            webhook,
+            agentverse_key,
+            name,
+            readme_content,
+            previous_readme_digest=previous_digest,
         )
         click.echo(f"Agent successfully registered @ {ai_identity.address}")
+        if not result.readme_uploaded:
+            click.echo("README unchanged, skipped uploading it.")
         # Optionally save information to .env file
         set_key(".env", "AI_IDENTITY", ai_identity.address)
         set_key(".env", "AI_NAME", name)
-        click.echo("Identity and name saved to .env.")
+        set_key(".env", "AI_README_DIGEST", result.readme_digest)
+        click.echo("Identity, name and README digest saved to .env.")
     except Exception as e:
         click.echo(f"Error registering agent: {str(e)}")
         sys.exit(1)
@@ -0,0 +1,316 @@
+"""
+Local snapshots of Almanac endpoint records.
+
+A snapshot is a small SQLite database mapping agent addresses to their
+endpoint, built once from the Almanac API, either for a list of addresses or
+for every agent found by paging through the search API. Snapshots are opened
+read-only and memory-mapped, so any number of worker processes can share one
+file through the page cache and resolve endpoints without network calls.
+Addresses missing from the snapshot are still looked up in the Almanac.
+
+Example:
+    build_almanac_snapshot("almanac.db", addresses)
+    set_default_almanac_snapshot(AlmanacSnapshot("almanac.db"))
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from fetchai.logging import logger
+from fetchai.registration import DEFAULT_ALMANAC_API_URL, DEFAULT_SEARCH_API_URL
+from fetchai.transport import Transport, get_default_transport
+
+# Environment variable naming the snapshot used by default, so worker
+# processes pick it up without any code changes
+SNAPSHOT_ENV_VAR = "FETCHAI_ALMANAC_SNAPSHOT"
+
+# Bytes of the snapshot file that are memory-mapped
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+
+# Seconds after which a snapshot is no longer used for lookups
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE endpoints (
+    address TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    weight INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class AlmanacSnapshot:
+    """A read-only, memory-mapped snapshot of Almanac endpoint records."""
+
+    def __init__(
+        self,
+        path: str,
+        mmap_size: int = DEFAULT_MMAP_SIZE,
+        max_age: Optional[float] = DEFAULT_MAX_AGE,
+    ):
+        """
+        Open a snapshot built by build_almanac_snapshot.
+        :param path: The snapshot file
+        :param mmap_size: The number of bytes of the file to memory-map
+        :param max_age: Seconds after its creation the snapshot stops answering
+            lookups (None to use it forever)
+        """
+        if not os.path.exists(path):
+            raise ValueError(f"Almanac snapshot {path} does not exist")
+        self.path = path
+        self.mmap_size = mmap_size
+        self.max_age = max_age
+        # sqlite connections must not be shared between threads, nor used
+        # across fork(), so each thread connects and reconnects in a child
+        self._local = threading.local()
+
+        metadata = self._metadata()
+        self.created_at = float(metadata.get("created_at", 0.0))
+        self.almanac_api: Optional[str] = metadata.get("almanac_api")
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            # a connection inherited from the parent process is left alone
+            uri = f"file:{quote(os.path.abspath(self.path))}?mode=ro"
+            connection = sqlite3.connect(uri, uri=True)
+            connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+            connection.execute("PRAGMA query_only = ON")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _metadata(self) -> Dict[str, str]:
+        return dict(self._connection.execute("SELECT key, value FROM metadata"))
+
+    @property
+    def expired(self) -> bool:
+        """Whether the snapshot is older than its max age."""
+        return self.max_age is not None and time.time() - self.created_at > self.max_age
+
+    def covers(self, almanac_api: str) -> bool:
+        """Whether the snapshot was built from the given Almanac API."""
+        return self.almanac_api is None or (
+            self.almanac_api.rstrip("/") == almanac_api.rstrip("/")
+        )
+
+    def lookup(
+        self, agent_address: str, almanac_api: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        The endpoint of an agent.
+        :param agent_address: The address of the agent
+        :param almanac_api: The Almanac API the caller would query, the snapshot
+            only answers for the API it was built from
+        :return: The endpoint, None if the agent is not in the snapshot or the
+            snapshot is expired or from another Almanac API
+        """
+        if self.expired or (almanac_api is not None and not self.covers(almanac_api)):
+            return None
+        row = self._connection.execute(
+            "SELECT url FROM endpoints WHERE address = ?", (agent_address,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def addresses(self) -> Iterator[str]:
+        for (address,) in self._connection.execute(
+            "SELECT address FROM endpoints ORDER BY address"
+        ):
+            yield address
+
+    def __contains__(self, agent_address: str) -> bool:
+        row = self._connection.execute(
+            "SELECT 1 FROM endpoints WHERE address = ?", (agent_address,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM endpoints").fetchone()[0]
+
+    def close(self):
+        """Close the connection of the calling thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection = None
+
+
+def _fetch_endpoint(
+    agent_address: str, almanac_api: str, transport: Transport
+) -> Optional[Tuple[str, str, int]]:
+    r = transport.get(f"{almanac_api}/agents/{agent_address}")
+    if r.status_code == 404:
+        return None
+    r.raise_for_status()
+    endpoints = r.json().get("endpoints") or []
+    if not endpoints:
+        return None
+    # the same endpoint send_message_to_agent would use
+    endpoint = endpoints[0]
+    return agent_address, endpoint["url"], int(endpoint.get("weight", 1))
+
+
+def search_agent_addresses(
+    query: str = "",
+    protocol_digest: Optional[str] = None,
+    *,
+    search_api: Optional[str] = None,
+    transport: Optional[Transport] = None,
+    page_size: int = 100,
+    max_agents: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Page through the agents found by the search API.
+    :param query: The search text (all agents if empty)
+    :param protocol_digest: Only agents supporting this protocol (any if omitted)
+    :param search_api: The URL of the search API (if different from the default)
+    :param transport: The HTTP transport to use (defaults to the shared transport)
+    :param page_size: The number of agents requested per page
+    :param max_agents: Stop after this many agents (all if omitted)
+    """
+    url = f"{search_api or DEFAULT_SEARCH_API_URL}/agents"
+    transport = transport or get_default_transport()
+    filters = {} if protocol_digest is None else {"protocol_digest": [protocol_digest]}
+
+    offset = 0
+    while max_agents is None or offset < max_agents:
+        limit = page_size if max_agents is None else min(page_size, max_agents - offset)
+        r = transport.post(
+            url,
+            json={
+                "search_text": query,
+                "sort": "created-at",
+                "filters": filters,
+                "direction": "asc",
+                "offset": offset,
+                "limit": limit,
+            },
+        )
+        r.raise_for_status()
+        agents = r.json().get("agents", [])
+        for agent in agents:
+            yield agent["address"]
+        offset += len(agents)
+        if len(agents) < limit:
+            return
+
+
+def build_almanac_snapshot(
+    path: str,
+    addresses: Iterable[str],
+    *,
+    almanac_api: Optional[str] = None,
+    transport: Optional[Transport] = None,
+    max_workers: int = 8,
+) -> int:
+    """
+    Fetch the endpoint records of the agents and write them to a new snapshot.
+    The snapshot is written to a temporary file first and then moved into
+    place, so processes never see a partially written snapshot.
+    :param path: The snapshot file to write (replaced if it exists)
+    :param addresses: The agents to include, e.g. from search_agent_addresses
+    :param almanac_api: The URL of the Almanac API (if different from the default)
+    :param transport: The HTTP transport to use (defaults to the shared transport)
+    :param max_workers: The number of lookups sent at the same time
+    :return: The number of agents written, agents without an endpoint are skipped
+    """
+    almanac_api = almanac_api or DEFAULT_ALMANAC_API_URL
+    transport = transport or get_default_transport()
+
+    def _fetch(agent_address: str) -> Optional[Tuple[str, str, int]]:
+        try:
+            return _fetch_endpoint(agent_address, almanac_api, transport)
+        except (httpx.HTTPError, ValueError, KeyError) as err:
+            logger.warning(
+                "Failed to look up agent endpoint for snapshot",
+                extra={"agent_address": agent_address, "error": str(err)},
+            )
+            return None
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".almanac-", suffix=".db", dir=directory)
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(tmp_path)
+        try:
+            connection.executescript(_SCHEMA)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                records: List[Tuple[str, str, int]] = [
+                    record
+                    for record in executor.map(_fetch, dict.fromkeys(addresses))
+                    if record is not None
+                ]
+            connection.executemany(
+                "INSERT OR REPLACE INTO endpoints VALUES (?, ?, ?)", records
+            )
+            connection.executemany(
+                "INSERT INTO metadata VALUES (?, ?)",
+                [("created_at", repr(time.time())), ("almanac_api", almanac_api)],
+            )
+            connection.commit()
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+        # mkstemp creates the file readable by its owner only, the snapshot is
+        # shared with workers that may run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    logger.info(
+        "Built almanac snapshot",
+        extra={"path": path, "agents": len(records)},
+    )
+    return len(records)
+
+
+_default_snapshot: Optional[AlmanacSnapshot] = None
+_default_snapshot_loaded = False
+_default_snapshot_lock = threading.Lock()
+
+
+def get_default_almanac_snapshot() -> Optional[AlmanacSnapshot]:
+    """
+    Return the process wide snapshot consulted by endpoint lookups, opened from
+    the FETCHAI_ALMANAC_SNAPSHOT environment variable on first use. None if no
+    snapshot is configured or it cannot be opened, endpoints are then looked
+    up in the Almanac.
+    """
+    global _default_snapshot, _default_snapshot_loaded
+    if not _default_snapshot_loaded:
+        with _default_snapshot_lock:
+            if not _default_snapshot_loaded:
+                path = os.environ.get(SNAPSHOT_ENV_VAR)
+                if path:
+                    try:
+                        _default_snapshot = AlmanacSnapshot(path)
+                    except (ValueError, sqlite3.Error) as err:
+                        logger.warning(
+                            "Failed to open almanac snapshot, using the Almanac instead",
+                            extra={"path": path, "error": str(err)},
+                        )
+                _default_snapshot_loaded = True
+    return _default_snapshot
+
+
+def set_default_almanac_snapshot(snapshot: Optional[AlmanacSnapshot]):
+    """Replace the process wide snapshot, None disables it."""
+    global _default_snapshot, _default_snapshot_loaded
+    with _default_snapshot_lock:
+        _default_snapshot = snapshot
+        _default_snapshot_loaded = True
@@ -3,7 +3,15 @@
 import os
 import click
 from dotenv import load_dotenv, set_key, dotenv_values
-from cli import env, identity, readme, register
+from cli import (
+    almanac,
+    derive_addresses,
+    env,
+    generate_identities,
+    identity,
+    readme,
+    register,
+)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,6 +26,9 @@ def cli():
 cli.add_command(readme)
 cli.add_command(identity)
 cli.add_command(register)
+cli.add_command(almanac)
+cli.add_command(generate_identities)
+cli.add_command(derive_addresses)
 
 
 if __name__ == "__main__":
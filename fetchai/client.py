@@ -0,0 +1,207 @@
+"""
+Request/reply messaging with agents.
+
+send_message_to_agent is fire-and-forget: replies arrive later on the webhook
+of the sender. An AgentClient sends every request in a session of its own
+and keeps the request in a table of pending requests until the reply for
+that session arrives, so callers simply await the reply:
+
+    client = AgentClient(identity)
+    reply = await client.ask(target, {"question": "Buy me a pair of shoes"})
+
+Replies are matched when the webhook passes them to parse_message_from_agent
+(or an AgentHost), from any thread. Every pending request expires through a
+timer of the event loop, so no polling is involved, and the number of
+pending requests is bounded: further requests wait until one completes.
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, Dict, Optional
+from uuid import UUID, uuid4
+
+import httpx
+
+from fetchai.communication import (
+    AgentMessage,
+    _build_envelope,
+    _conversations,
+    _conversations_lock,
+    _EndpointCache,
+    _post_envelope_async,
+)
+from fetchai.crypto import Identity
+from fetchai.registration import DEFAULT_ALMANAC_API_URL
+from fetchai.transport import AsyncTransport
+
+DEFAULT_REPLY_TIMEOUT = 30.0
+DEFAULT_MAX_PENDING = 1024
+
+
+class ReplyTimeout(asyncio.TimeoutError):
+    """Raised when an agent does not reply to a request in time."""
+
+    def __init__(self, target: str, session: UUID, timeout: float):
+        super().__init__(
+            f"No reply from {target} in session {session} within {timeout}s"
+        )
+        self.target = target
+        self.session = session
+        self.timeout = timeout
+
+
+class _PendingRequest:
+    """A request awaiting its reply, registered with the session router."""
+
+    __slots__ = ("target", "session", "future", "loop", "timer", "__weakref__")
+
+    def __init__(self, target: str, session: UUID, loop: asyncio.AbstractEventLoop):
+        self.target = target
+        self.session = session
+        self.loop = loop
+        self.future: "asyncio.Future[AgentMessage]" = loop.create_future()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+    def receive(self, message: AgentMessage):
+        # called by route_to_conversation, usually from a webhook thread
+        try:
+            self.loop.call_soon_threadsafe(self._resolve, message)
+        except RuntimeError:
+            # the event loop of the request is closed
+            pass
+
+    def _resolve(self, message: AgentMessage):
+        if not self.future.done():
+            self.future.set_result(message)
+
+    def expire(self, timeout: float):
+        if not self.future.done():
+            self.future.set_exception(ReplyTimeout(self.target, self.session, timeout))
+
+
+class AgentClient:
+    """Sends requests to agents and awaits their replies."""
+
+    def __init__(
+        self,
+        sender: Identity,
+        *,
+        timeout: float = DEFAULT_REPLY_TIMEOUT,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        almanac_api: Optional[str] = None,
+        transport: Optional[AsyncTransport] = None,
+        crypto_pool: Optional[Executor] = None,
+    ):
+        """
+        Create a new client for use from one event loop.
+        :param sender: The identity requests are sent from, replies must reach
+            the webhook registered for it
+        :param timeout: Seconds to wait for a reply unless ask() is given another timeout
+        :param max_pending: The number of requests awaiting a reply at the same time
+        :param almanac_api: The URL of the Almanac API (if different from the default)
+        :param transport: The async HTTP transport to use (a new one is created if omitted)
+        :param crypto_pool: Executor requests are signed on, so signing does not
+            block the event loop (defaults to the loop's default executor)
+        """
+        self.sender = sender
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.almanac_api = almanac_api or DEFAULT_ALMANAC_API_URL
+
+        self.crypto_pool = crypto_pool
+
+        self._transport = transport or AsyncTransport()
+        self._endpoints = _EndpointCache(self.almanac_api, self._transport)
+        self._pending: Dict[UUID, _PendingRequest] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def pending(self) -> int:
+        """The number of requests awaiting a reply."""
+        return len(self._pending)
+
+    async def ask(
+        self,
+        target: str,
+        payload: Any,
+        *,
+        timeout: Optional[float] = None,
+        # The default protocol for AI to AI conversation, use for standard chat
+        protocol_digest: Optional[
+            str
+        ] = "proto:a03398ea81d7aaaf67e72940937676eae0d019f8e1d8b5efbadfef9fd2e98bb2",
+        # Derived from the payload model, or the default chat model for plain payloads
+        model_digest: Optional[str] = None,
+        compression: Optional[str] = None,
+    ) -> AgentMessage:
+        """
+        Send a request to an agent and wait for its reply.
+        :param target: The address of the target agent.
+        :param payload: The payload of the request, JSON values or a model instance
+        :param timeout: Seconds to wait for the reply (defaults to the client timeout)
+        :param protocol_digest: The digest of the protocol that is being used
+        :param model_digest: The digest of the model that is being used
+        :param compression: Compress large payloads with "gzip" or "zstd"
+        :return: The reply, sent by the target in the session of the request
+        :raises ReplyTimeout: If no reply arrives in time
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if self._slots is None:
+            # created on first use, inside the event loop of the client
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            session = uuid4()
+            request = _PendingRequest(target, session, loop)
+
+            # registered before sending, so that even an immediate reply is matched
+            self._pending[session] = request
+            with _conversations_lock:
+                _conversations[session] = request
+            request.timer = loop.call_later(timeout, request.expire, timeout)
+            try:
+                env = await loop.run_in_executor(
+                    self.crypto_pool,
+                    partial(
+                        _build_envelope,
+                        self.sender,
+                        target,
+                        payload,
+                        session,
+                        protocol_digest,
+                        model_digest,
+                        compression=compression,
+                    ),
+                )
+                endpoint = await self._endpoints.get(target)
+                try:
+                    await _post_envelope_async(endpoint, env, self._transport)
+                except httpx.HTTPError:
+                    # the agent may have moved, look it up again next time
+                    self._endpoints.invalidate(target)
+                    raise
+                return await request.future
+            finally:
+                request.timer.cancel()
+                if request.future.done() and not request.future.cancelled():
+                    # a send error may have raised past an expired request
+                    request.future.exception()
+                del self._pending[session]
+                with _conversations_lock:
+                    if _conversations.get(session) is request:
+                        del _conversations[session]
+
+    async def aclose(self):
+        """Fail all pending requests and close the transport."""
+        for request in list(self._pending.values()):
+            if not request.future.done():
+                request.future.cancel()
+        await self._transport.aclose()
+
+    async def __aenter__(self) -> "AgentClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -1,20 +1,99 @@
+import asyncio
 import base64
+import gzip
 import hashlib
-import json
+import itertools
 import struct
-from typing import Optional, Any
-from uuid import uuid4
+import threading
+import weakref
+import zlib
+from collections import deque
+from typing import TYPE_CHECKING, Optional, Any, Callable, Deque, Dict, Set
+from uuid import UUID, uuid4
 from dataclasses import dataclass
 
-import requests
+import httpx
 from pydantic import BaseModel, UUID4
 
+from fetchai.almanac import AlmanacSnapshot, get_default_almanac_snapshot
 from fetchai.crypto import Identity
 from fetchai.registration import DEFAULT_ALMANAC_API_URL
 from fetchai.logging import logger
+from fetchai.schema import get_default_model_registry
+from fetchai.transport import AsyncTransport, Transport, get_default_transport
+
+if TYPE_CHECKING:
+    from fetchai.inbound import InboundPipeline
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 JsonStr = str
 
+# The default model for AI to AI conversation, used for plain (non model) payloads
+DEFAULT_MODEL_DIGEST = (
+    "model:708d789bb90924328daa69a47f7a8f3483980f16a1142c24b12972a2e4174bc6"
+)
+
+# Compressed payloads are recognised by the magic bytes of their format. A JSON
+# document can never start with either of these, so plain payloads are
+# unaffected and decode_payload needs no extra flag on the envelope.
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+COMPRESSION_FORMATS = ("gzip", "zstd")
+
+# Payloads smaller than this (in bytes) are never compressed
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+# Upper bound for a decompressed payload, protects against decompression bombs
+MAX_DECOMPRESSED_PAYLOAD_SIZE = 16 * 1024 * 1024
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(data, mtime=0)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError(
+                "zstd compression requires the zstandard package, "
+                "install fetchai[zstd]"
+            )
+        return zstandard.ZstdCompressor().compress(data)
+    raise ValueError(f"Unsupported payload compression: {compression}")
+
+
+def _decompress(data: bytes, max_size: int) -> bytes:
+    if data.startswith(GZIP_MAGIC):
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        try:
+            decoded = decompressor.decompress(data, max_size + 1)
+        except zlib.error as err:
+            raise ValueError(f"Invalid gzip payload: {err}") from err
+        if not decompressor.eof and len(decoded) <= max_size:
+            raise ValueError("Invalid gzip payload: truncated stream")
+    elif data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError(
+                "Payload is zstd compressed but the zstandard package is not installed"
+            )
+        try:
+            with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+                decoded = reader.read(max_size + 1)
+            # frames written by _compress record their size, a truncated
+            # frame decodes to less without an error
+            size = zstandard.frame_content_size(data)
+        except zstandard.ZstdError as err:
+            raise ValueError(f"Invalid zstd payload: {err}") from err
+        if 0 <= size <= max_size and len(decoded) != size:
+            raise ValueError("Invalid zstd payload: truncated stream")
+    else:
+        return data
+
+    if len(decoded) > max_size:
+        raise ValueError(f"Decompressed payload exceeds {max_size} bytes")
+    return decoded
+
 
 class Envelope(BaseModel):
     version: int
@@ -30,14 +109,39 @@ class Envelope(BaseModel):
     nonce: Optional[int] = None
     signature: Optional[str] = None
 
-    def encode_payload(self, value: JsonStr):
-        self.payload = base64.b64encode(value.encode()).decode()
+    def encode_payload(
+        self,
+        value: JsonStr,
+        compression: Optional[str] = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+    ):
+        """
+        Encode the payload of the envelope.
 
-    def decode_payload(self) -> str:
+        Compression is opt-in and only understood by receivers using this
+        library, standard uAgents expect plain base64 encoded JSON.
+        :param value: The JSON payload
+        :param compression: Compress the payload with "gzip" or "zstd" first
+        :param compression_threshold: Payloads smaller than this many bytes are not compressed
+        """
+        if compression is not None and compression not in COMPRESSION_FORMATS:
+            raise ValueError(f"Unsupported payload compression: {compression}")
+
+        data = value.encode()
+        if compression is not None and len(data) >= compression_threshold:
+            data = _compress(data, compression)
+        self.payload = base64.b64encode(data).decode()
+
+    def decode_payload(self, max_size: int = MAX_DECOMPRESSED_PAYLOAD_SIZE) -> str:
+        """
+        Decode the payload of the envelope, compressed payloads are detected
+        and decompressed automatically.
+        :param max_size: The largest size in bytes a compressed payload may expand to
+        """
         if self.payload is None:
             return ""
 
-        return base64.b64decode(self.payload).decode()
+        return _decompress(base64.b64decode(self.payload), max_size).decode()
 
     def sign(self, identity: Identity):
         try:
@@ -65,13 +169,34 @@ class Envelope(BaseModel):
         return hasher.digest()
 
 
-def lookup_endpoint_for_agent(agent_address: str) -> str:
+def _snapshot_endpoint(
+    agent_address: str, almanac_api: str, snapshot: Optional[AlmanacSnapshot] = None
+) -> Optional[str]:
+    if snapshot is None:
+        snapshot = get_default_almanac_snapshot()
+    if snapshot is None:
+        return None
+    return snapshot.lookup(agent_address, almanac_api)
+
+
+def _lookup_endpoint(
+    agent_address: str,
+    almanac_api: str,
+    transport: Transport,
+    snapshot: Optional[AlmanacSnapshot] = None,
+    use_snapshot: bool = True,
+) -> str:
+    if use_snapshot:
+        endpoint = _snapshot_endpoint(agent_address, almanac_api, snapshot)
+        if endpoint is not None:
+            return endpoint
+
     request_meta = {
         "agent_address": agent_address,
-        "lookup_url": DEFAULT_ALMANAC_API_URL,
+        "lookup_url": almanac_api,
     }
     logger.debug("looking up endpoint for agent", extra=request_meta)
-    r = requests.get(f"{DEFAULT_ALMANAC_API_URL}/agents/{agent_address}")
+    r = transport.get(f"{almanac_api}/agents/{agent_address}")
     r.raise_for_status()
 
     request_meta["response_status"] = r.status_code
@@ -83,6 +208,182 @@ def lookup_endpoint_for_agent(agent_address: str) -> str:
     return r.json()["endpoints"][0]["url"]
 
 
+async def _lookup_endpoint_async(
+    agent_address: str,
+    almanac_api: str,
+    transport: AsyncTransport,
+    use_snapshot: bool = True,
+) -> str:
+    if use_snapshot:
+        endpoint = _snapshot_endpoint(agent_address, almanac_api)
+        if endpoint is not None:
+            return endpoint
+
+    request_meta = {
+        "agent_address": agent_address,
+        "lookup_url": almanac_api,
+    }
+    logger.debug("looking up endpoint for agent", extra=request_meta)
+    r = await transport.get(f"{almanac_api}/agents/{agent_address}")
+    r.raise_for_status()
+
+    request_meta["response_status"] = r.status_code
+    logger.info(
+        "Got response looking up agent endpoint",
+        extra=request_meta,
+    )
+
+    return r.json()["endpoints"][0]["url"]
+
+
+class _EndpointCache:
+    """
+    Cached endpoint lookups for use from one event loop. Concurrent lookups of
+    a target share one request, and a target whose endpoint failed is looked
+    up in the Almanac itself from then on, bypassing the snapshot.
+    """
+
+    def __init__(self, almanac_api: str, transport: AsyncTransport):
+        self.almanac_api = almanac_api
+        self.transport = transport
+        self._endpoints: Dict[str, str] = {}
+        self._lookups: Dict[str, "asyncio.Future[str]"] = {}
+        self._moved: Set[str] = set()
+
+    async def get(self, target: str) -> str:
+        endpoint = self._endpoints.get(target)
+        if endpoint is None:
+            lookup = self._lookups.get(target)
+            if lookup is None:
+                lookup = asyncio.ensure_future(
+                    _lookup_endpoint_async(
+                        target,
+                        self.almanac_api,
+                        self.transport,
+                        use_snapshot=target not in self._moved,
+                    )
+                )
+                lookup.add_done_callback(lambda _: self._lookups.pop(target, None))
+                self._lookups[target] = lookup
+            endpoint = await asyncio.shield(lookup)
+            self._endpoints[target] = endpoint
+        return endpoint
+
+    def invalidate(self, target: str):
+        """Forget the endpoint of a target after sending to it failed."""
+        self._endpoints.pop(target, None)
+        self._moved.add(target)
+
+
+def lookup_endpoint_for_agent(
+    agent_address: str,
+    almanac_api: Optional[str] = None,
+    transport: Optional[Transport] = None,
+    snapshot: Optional[AlmanacSnapshot] = None,
+    use_snapshot: bool = True,
+) -> str:
+    """
+    Look up the endpoint of an agent, in the Almanac snapshot first.
+    :param agent_address: The address of the agent
+    :param almanac_api: The URL of the Almanac API (if different from the default)
+    :param transport: The HTTP transport to use (defaults to the shared transport)
+    :param snapshot: The snapshot to consult (defaults to the shared snapshot, if any)
+    :param use_snapshot: False to always query the Almanac, e.g. after sending to
+        the endpoint from the snapshot failed
+    """
+    return _lookup_endpoint(
+        agent_address,
+        almanac_api or DEFAULT_ALMANAC_API_URL,
+        transport or get_default_transport(),
+        snapshot,
+        use_snapshot,
+    )
+
+
+def _prepare_envelope(
+    sender: str,
+    target: str,
+    payload: Any,
+    session: UUID,
+    protocol_digest: Optional[str],
+    model_digest: Optional[str],
+    nonce: Optional[int] = None,
+    compression: Optional[str] = None,
+) -> Envelope:
+    """Build the envelope of a message without signing it."""
+    json_payload, payload_digest = get_default_model_registry().encode(payload)
+    model_digest = model_digest or payload_digest or DEFAULT_MODEL_DIGEST
+
+    env = Envelope(
+        version=1,
+        sender=sender,
+        target=target,
+        session=session,
+        schema_digest=model_digest,
+        protocol_digest=protocol_digest,
+        nonce=nonce,
+    )
+
+    env.encode_payload(json_payload, compression)
+    return env
+
+
+def _build_envelope(
+    sender: Identity,
+    target: str,
+    payload: Any,
+    session: UUID,
+    protocol_digest: Optional[str],
+    model_digest: Optional[str],
+    nonce: Optional[int] = None,
+    compression: Optional[str] = None,
+) -> Envelope:
+    env = _prepare_envelope(
+        sender.address,
+        target,
+        payload,
+        session,
+        protocol_digest,
+        model_digest,
+        nonce,
+        compression,
+    )
+    env.sign(sender)
+    return env
+
+
+def _post_envelope(
+    endpoint: str,
+    env: Envelope,
+    transport: Transport,
+):
+    request_meta = {"agent_address": env.target, "agent_endpoint": endpoint}
+    logger.debug("Sending message to agent", extra=request_meta)
+    r = transport.post(
+        endpoint,
+        headers={"content-type": "application/json"},
+        content=env.model_dump_json(),
+    )
+    r.raise_for_status()
+    logger.info("Sent message to agent", extra=request_meta)
+
+
+async def _post_envelope_async(
+    endpoint: str,
+    env: Envelope,
+    transport: AsyncTransport,
+):
+    request_meta = {"agent_address": env.target, "agent_endpoint": endpoint}
+    logger.debug("Sending message to agent", extra=request_meta)
+    r = await transport.post(
+        endpoint,
+        headers={"content-type": "application/json"},
+        content=env.model_dump_json(),
+    )
+    r.raise_for_status()
+    logger.info("Sent message to agent", extra=request_meta)
+
+
 def send_message_to_agent(
     sender: Identity,
     target: str,
@@ -91,10 +392,11 @@ def send_message_to_agent(
     protocol_digest: Optional[
         str
     ] = "proto:a03398ea81d7aaaf67e72940937676eae0d019f8e1d8b5efbadfef9fd2e98bb2",
-    # The default model for AI to AI conversation, use for standard chat
-    model_digest: Optional[
-        str
-    ] = "model:708d789bb90924328daa69a47f7a8f3483980f16a1142c24b12972a2e4174bc6",
+    # Derived from the payload model, or the default chat model for plain payloads
+    model_digest: Optional[str] = None,
+    almanac_api: Optional[str] = None,
+    compression: Optional[str] = None,
+    transport: Optional[Transport] = None,
 ):
     """
     Send a message to an agent.
@@ -102,39 +404,31 @@ def send_message_to_agent(
     :param target: The address of the target agent.
     :param protocol_digest: The digest of the protocol that is being used
     :param model_digest: The digest of the model that is being used
-    :param payload: The payload of the message.
+    :param payload: The payload of the message, JSON values or a model instance
+        (see fetchai.schema)
+    :param almanac_api: The URL of the Almanac API (if different from the default)
+    :param compression: Compress large payloads with "gzip" or "zstd", the
+        target must be able to decode them (see Envelope.encode_payload)
+    :param transport: The HTTP transport to use (defaults to the shared transport)
     :return:
     """
-    json_payload = json.dumps(payload, separators=(",", ":"))
-
-    env = Envelope(
-        version=1,
-        sender=sender.address,
-        target=target,
-        session=uuid4(),
-        schema_digest=model_digest,
-        protocol_digest=protocol_digest,
+    env = _build_envelope(
+        sender,
+        target,
+        payload,
+        uuid4(),
+        protocol_digest,
+        model_digest,
+        compression=compression,
     )
 
-    env.encode_payload(json_payload)
-    env.sign(sender)
-
-    print(env.model_dump_json())
+    transport = transport or get_default_transport()
 
     # query the almanac to lookup the target agent
-    endpoint = lookup_endpoint_for_agent(target)
-    print(endpoint)
+    endpoint = lookup_endpoint_for_agent(target, almanac_api, transport)
 
     # send the envelope to the target agent
-    request_meta = {"agent_address": target, "agent_endpoint": endpoint}
-    logger.debug("Sending message to agent", extra=request_meta)
-    r = requests.post(
-        endpoint,
-        headers={"content-type": "application/json"},
-        data=env.model_dump_json(),
-    )
-    r.raise_for_status()
-    logger.info("Sent message to agent", extra=request_meta)
+    _post_envelope(endpoint, env, transport)
 
 
 @dataclass
@@ -145,21 +439,192 @@ class AgentMessage:
     target: str
     # The payload of the message.
     payload: Any
+    # The session the message belongs to.
+    session: Optional[UUID] = None
+
+
+# Open conversations, and requests of an AgentClient awaiting their reply, by
+# session. Entries disappear once they are closed or garbage collected, every
+# entry has a `target` and a `receive(message)` method.
+_conversations: "weakref.WeakValueDictionary[UUID, Any]" = weakref.WeakValueDictionary()
+_conversations_lock = threading.Lock()
+
+
+class Conversation:
+    """
+    A multi-turn exchange between a sender identity and a target agent.
+
+    Every message sent through a conversation shares one session, so the
+    target can correlate the turns and its replies can be routed back here by
+    parse_message_from_agent. The target endpoint is looked up once and
+    cached, messages are posted over the pooled connections of the transport
+    and each envelope carries a monotonically increasing nonce.
+
+    Conversations are tracked by weak reference, keep a reference to the
+    object for as long as replies should be routed to it.
+    """
+
+    def __init__(
+        self,
+        sender: Identity,
+        target: str,
+        *,
+        session: Optional[UUID] = None,
+        # The default protocol for AI to AI conversation, use for standard chat
+        protocol_digest: Optional[
+            str
+        ] = "proto:a03398ea81d7aaaf67e72940937676eae0d019f8e1d8b5efbadfef9fd2e98bb2",
+        # Derived from the payload model, or the default chat model for plain payloads
+        model_digest: Optional[str] = None,
+        almanac_api: Optional[str] = None,
+        compression: Optional[str] = None,
+        transport: Optional[Transport] = None,
+        on_message: Optional[Callable[["AgentMessage"], None]] = None,
+        history: int = 100,
+    ):
+        """
+        Open a new conversation.
+        :param sender: The identity of the sender.
+        :param target: The address of the target agent.
+        :param session: The session to resume (a new one is created if omitted)
+        :param protocol_digest: The digest of the protocol that is being used
+        :param model_digest: The digest of the model that is being used (derived
+            from the payload of every message if omitted)
+        :param almanac_api: The URL of the Almanac API (if different from the default)
+        :param compression: Compress large payloads with "gzip" or "zstd"
+        :param transport: The HTTP transport to use (defaults to the shared transport)
+        :param on_message: Called with every message received in this conversation
+        :param history: The number of received messages to keep in `messages`
+        """
+        self.sender = sender
+        self.target = target
+        self.session = session or uuid4()
+        self.protocol_digest = protocol_digest
+        self.model_digest = model_digest
+        self.almanac_api = almanac_api or DEFAULT_ALMANAC_API_URL
+        self.compression = compression
+        self.on_message = on_message
+        self.messages: Deque[AgentMessage] = deque(maxlen=history)
+
+        self._endpoint: Optional[str] = None
+        self._use_snapshot = True
+        self._transport = transport or get_default_transport()
+        self._nonces = itertools.count(1)
+        self._lock = threading.Lock()
+
+        with _conversations_lock:
+            _conversations[self.session] = self
+
+    @property
+    def endpoint(self) -> str:
+        """The endpoint of the target agent, looked up on first use."""
+        with self._lock:
+            if self._endpoint is None:
+                self._endpoint = _lookup_endpoint(
+                    self.target,
+                    self.almanac_api,
+                    self._transport,
+                    use_snapshot=self._use_snapshot,
+                )
+            return self._endpoint
+
+    def send(self, payload: Any):
+        """
+        Send the next message of the conversation.
+        :param payload: The payload of the message.
+        :return:
+        """
+        env = _build_envelope(
+            self.sender,
+            self.target,
+            payload,
+            self.session,
+            self.protocol_digest,
+            self.model_digest,
+            nonce=next(self._nonces),
+            compression=self.compression,
+        )
+
+        endpoint = self.endpoint
+        try:
+            _post_envelope(endpoint, env, self._transport)
+        except httpx.HTTPError:
+            # the agent may have moved, look it up again in the Almanac itself
+            # on the next turn, a snapshot would return the same endpoint
+            with self._lock:
+                if self._endpoint == endpoint:
+                    self._endpoint = None
+                    self._use_snapshot = False
+            raise
+
+    def receive(self, message: "AgentMessage"):
+        """Record a message received in this conversation."""
+        self.messages.append(message)
+        if self.on_message is not None:
+            self.on_message(message)
+
+    def close(self):
+        with _conversations_lock:
+            if _conversations.get(self.session) is self:
+                del _conversations[self.session]
+
+    def __enter__(self) -> "Conversation":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def get_conversation(session: UUID) -> Optional[Conversation]:
+    """Return the open conversation for a session, if there is one."""
+    with _conversations_lock:
+        conversation = _conversations.get(session)
+    return conversation if isinstance(conversation, Conversation) else None
+
+
+_default_pipeline: Optional["InboundPipeline"] = None
+
+
+def route_to_conversation(message: AgentMessage) -> bool:
+    """
+    Deliver a message to the open Conversation, or the request awaiting a
+    reply, of its session.
+    :param message: The received message
+    :return: True if the message was delivered to a conversation or request
+    """
+    with _conversations_lock:
+        conversation = _conversations.get(message.session)
+    # only the agent a conversation is with can reply into it
+    if conversation is None or conversation.target != message.sender:
+        return False
+
+    conversation.receive(message)
+    return True
 
 
-def parse_message_from_agent(content: JsonStr) -> AgentMessage:
+def parse_message_from_agent(
+    content: JsonStr, pipeline: Optional["InboundPipeline"] = None
+) -> AgentMessage:
     """
-    Parse a message from an agent.
+    Parse a message from an agent. If the message is a reply in an open
+    Conversation, or to a pending AgentClient request, it is also delivered
+    there.
     :param content: A string containing the JSON envelope.
-    :return: An AgentMessage object.
+    :param pipeline: The pipeline validating the envelope, by default the size,
+        expiry and signature of the envelope are checked
+    :return: An AgentMessage object, its payload is decoded on first access.
     """
+    global _default_pipeline
+    if pipeline is None:
+        if _default_pipeline is None:
+            # imported here as fetchai.inbound builds on this module
+            from fetchai.inbound import InboundPipeline
 
-    env = Envelope.model_validate_json(content)
+            _default_pipeline = InboundPipeline()
+        pipeline = _default_pipeline
 
-    if not env.verify():
-        raise ValueError("Invalid envelope signature")
+    message = pipeline.process(content)
 
-    json_payload = env.decode_payload()
-    payload = json.loads(json_payload)
+    route_to_conversation(message)
 
-    return AgentMessage(sender=env.sender, target=env.target, payload=payload)
+    return message
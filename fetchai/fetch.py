@@ -1,14 +1,19 @@
 from typing import Optional
 import httpx
 
+from fetchai.registration import DEFAULT_SEARCH_API_URL
+from fetchai.transport import Transport, get_default_transport
+
 
 def ai(
     query: str,
     protocol: Optional[
         str
     ] = "proto:a03398ea81d7aaaf67e72940937676eae0d019f8e1d8b5efbadfef9fd2e98bb2",
+    search_api: Optional[str] = None,
+    transport: Optional[Transport] = None,
 ) -> dict:
-    url = "https://agentverse.ai/v1/search/agents"
+    url = f"{search_api or DEFAULT_SEARCH_API_URL}/agents"
     headers = {
         "Content-Type": "application/json",
     }
@@ -31,7 +36,8 @@ def ai(
     }
 
     try:
-        response = httpx.post(url, json=data, headers=headers, timeout=10.0)
+        transport = transport or get_default_transport()
+        response = transport.post(url, json=data, headers=headers)
         return {"ais": response.json().get("agents", [])}
     except httpx.RequestError as exc:
         return {"ais": [], "error": f"{exc}"}
@@ -0,0 +1,320 @@
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor
+from socketserver import ThreadingMixIn
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID, uuid4
+from wsgiref.simple_server import WSGIServer, make_server
+
+from fetchai.communication import (
+    AgentMessage,
+    _build_envelope,
+    _post_envelope,
+    lookup_endpoint_for_agent,
+    route_to_conversation,
+)
+from fetchai.crypto import Identity
+from fetchai.inbound import InboundPipeline
+from fetchai.logging import logger
+from fetchai.registration import register_batch_with_agentverse
+from fetchai.transport import Transport, get_default_transport
+
+MessageHandler = Callable[[AgentMessage], None]
+
+
+class _HostedAgent:
+    # kept deliberately small, a host may serve thousands of agents
+    __slots__ = ("private_key", "handler", "title")
+
+    def __init__(
+        self,
+        private_key: bytes,
+        handler: Optional[MessageHandler],
+        title: Optional[str],
+    ):
+        self.private_key = private_key
+        self.handler = handler
+        self.title = title
+
+
+class AgentHost:
+    """
+    Serves many agents from one process behind a single HTTP endpoint.
+
+    Inbound envelopes are routed by their target address to the handler of the
+    hosted agent. All agents share one HTTP transport and, optionally, one
+    executor for signature verification. Only the 32 byte signing key of every
+    agent is kept, full identities are rebuilt on demand and cached for the
+    most recently used agents.
+
+    The host is a WSGI application, so it can be served by any WSGI server or
+    with serve() for a simple threaded server.
+    """
+
+    def __init__(
+        self,
+        handler: Optional[MessageHandler] = None,
+        *,
+        transport: Optional[Transport] = None,
+        crypto_pool: Optional[Executor] = None,
+        almanac_api: Optional[str] = None,
+        identity_cache_size: int = 128,
+        pipeline: Optional[InboundPipeline] = None,
+    ):
+        """
+        Create a new, empty host.
+        :param handler: The handler for agents that were added without one
+        :param transport: The HTTP transport to use (defaults to the shared transport)
+        :param crypto_pool: Executor used to verify inbound signatures (inline if omitted)
+        :param almanac_api: The URL of the Almanac API (if different from the default)
+        :param identity_cache_size: How many rebuilt identities are kept for sending
+        :param pipeline: The pipeline validating inbound envelopes (defaults to one
+            that only accepts envelopes for hosted agents)
+        """
+        self.handler = handler
+        self.transport = transport or get_default_transport()
+        self.crypto_pool = crypto_pool
+        self.almanac_api = almanac_api
+        self.identity_cache_size = identity_cache_size
+
+        self._agents: Dict[str, _HostedAgent] = {}
+        self._identities: "OrderedDict[str, Identity]" = OrderedDict()
+        self._identities_lock = threading.Lock()
+
+        self.pipeline = pipeline or InboundPipeline(
+            targets=self, crypto_pool=crypto_pool
+        )
+
+    def add_agent(
+        self,
+        identity: Identity,
+        handler: Optional[MessageHandler] = None,
+        *,
+        title: Optional[str] = None,
+    ) -> str:
+        """
+        Host an agent.
+        :param identity: The identity of the agent
+        :param handler: Called with every message for this agent (defaults to the host handler)
+        :param title: The title used when registering the agent
+        :return: The address of the agent
+        """
+        self._agents[identity.address] = _HostedAgent(
+            bytes.fromhex(identity.private_key), handler, title
+        )
+        return identity.address
+
+    def add_agents_from_seed(
+        self,
+        seed: str,
+        indices: Iterable[int],
+        handler: Optional[MessageHandler] = None,
+    ) -> List[str]:
+        """
+        Host the agents derived from a seed with Identity.from_seed.
+        :param seed: The seed of the agents
+        :param indices: The derivation indices of the agents
+        :param handler: Called with every message for these agents (defaults to the host handler)
+        :return: The addresses of the agents
+        """
+        return [
+            self.add_agent(Identity.from_seed(seed, index), handler)
+            for index in indices
+        ]
+
+    def remove_agent(self, address: str):
+        self._agents.pop(address, None)
+        with self._identities_lock:
+            self._identities.pop(address, None)
+
+    @property
+    def addresses(self) -> List[str]:
+        return list(self._agents)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._agents
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def identity(self, address: str) -> Identity:
+        """Return the identity of a hosted agent."""
+        with self._identities_lock:
+            identity = self._identities.get(address)
+            if identity is not None:
+                self._identities.move_to_end(address)
+                return identity
+
+        agent = self._agents.get(address)
+        if agent is None:
+            raise ValueError(f"Agent {address} is not hosted here")
+        identity = Identity.from_string(agent.private_key.hex())
+
+        with self._identities_lock:
+            self._identities[address] = identity
+            while len(self._identities) > self.identity_cache_size:
+                self._identities.popitem(last=False)
+        return identity
+
+    def handle(self, content: Any) -> AgentMessage:
+        """
+        Run an inbound envelope through the pipeline of the host and dispatch
+        it to the handler of its target.
+        :param content: The JSON envelope as str or bytes
+        :return: The dispatched message
+        :raises MessageRejected: If the pipeline rejects the envelope
+        """
+        message = self.pipeline.process(content)
+
+        if not route_to_conversation(message):
+            agent = self._agents.get(message.target)
+            handler = (agent.handler if agent else None) or self.handler
+            if handler is None:
+                raise ValueError(f"Agent {message.target} has no message handler")
+            handler(message)
+        return message
+
+    def send(
+        self,
+        sender: str,
+        target: str,
+        payload: Any,
+        *,
+        session: Optional[UUID] = None,
+        # The default protocol for AI to AI conversation, use for standard chat
+        protocol_digest: Optional[
+            str
+        ] = "proto:a03398ea81d7aaaf67e72940937676eae0d019f8e1d8b5efbadfef9fd2e98bb2",
+        # Derived from the payload model, or the default chat model for plain payloads
+        model_digest: Optional[str] = None,
+        compression: Optional[str] = None,
+    ):
+        """
+        Send a message from a hosted agent.
+        :param sender: The address of the hosted agent sending the message
+        :param target: The address of the target agent
+        :param payload: The payload of the message, JSON values or a model instance
+        :param session: The session of the message (a new one is created if omitted)
+        :param protocol_digest: The digest of the protocol that is being used
+        :param model_digest: The digest of the model that is being used
+        :param compression: Compress large payloads with "gzip" or "zstd"
+        """
+        env = _build_envelope(
+            self.identity(sender),
+            target,
+            payload,
+            session or uuid4(),
+            protocol_digest,
+            model_digest,
+            compression=compression,
+        )
+        endpoint = lookup_endpoint_for_agent(target, self.almanac_api, self.transport)
+        _post_envelope(endpoint, env, self.transport)
+
+    def reply(self, message: AgentMessage, payload: Any, **kwargs):
+        """Reply to a message received by a hosted agent, in the same session."""
+        self.send(
+            message.target, message.sender, payload, session=message.session, **kwargs
+        )
+
+    def register_all(
+        self,
+        url: str,
+        agentverse_token: str,
+        readme: str,
+        *,
+        title: Optional[str] = None,
+        protocol_digest: Optional[
+            str
+        ] = "proto:a03398ea81d7aaaf67e72940937676eae0d019f8e1d8b5efbadfef9fd2e98bb2",
+        almanac_api: Optional[str] = None,
+        mailbox_api: Optional[str] = None,
+        max_workers: int = 8,
+    ) -> Dict[str, Exception]:
+        """
+        Register every hosted agent with the Agentverse API, all at the endpoint of this host.
+        :param url: The URL this host is served at
+        :param agentverse_token: The token to use to authenticate with the Agentverse API
+        :param readme: The readme for the agents
+        :param title: The title of agents added without one (defaults to the address)
+        :param protocol_digest: The digest of the protocol that the agents support
+        :param almanac_api: The URL of the Almanac API (if different from the default)
+        :param mailbox_api: The URL of the Agentverse agents API (if different from the default)
+        :param max_workers: The number of registrations in flight at once
+        :return: The error of every agent that failed to register, by address
+        """
+
+        def _agents() -> Iterator[Tuple[Identity, str, str]]:
+            for address, agent in list(self._agents.items()):
+                identity = Identity.from_string(agent.private_key.hex())
+                yield identity, agent.title or title or address, readme
+
+        return register_batch_with_agentverse(
+            _agents(),
+            url,
+            agentverse_token,
+            protocol_digest=protocol_digest,
+            almanac_api=almanac_api or self.almanac_api,
+            mailbox_api=mailbox_api,
+            transport=self.transport,
+            max_workers=max_workers,
+        )
+
+    def __call__(self, environ, start_response):
+        if environ["REQUEST_METHOD"] != "POST":
+            return self._respond(
+                start_response, "405 Method Not Allowed", {"error": "POST required"}
+            )
+
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return self._respond(
+                start_response, "400 Bad Request", {"error": "invalid Content-Length"}
+            )
+        # rejected before the body is read, so a client cannot make the host
+        # allocate any size it claims
+        max_size = self.pipeline.max_size
+        if max_size is not None and length > max_size:
+            return self._respond(
+                start_response,
+                "413 Payload Too Large",
+                {"error": f"envelope of {length} bytes exceeds {max_size} bytes"},
+            )
+        content = environ["wsgi.input"].read(length)
+        try:
+            self.handle(content)
+        except ValueError as err:
+            return self._respond(start_response, "400 Bad Request", {"error": str(err)})
+        except Exception:
+            logger.exception("Failed to handle agent message")
+            return self._respond(
+                start_response, "500 Internal Server Error", {"error": "internal"}
+            )
+        return self._respond(start_response, "200 OK", {})
+
+    @staticmethod
+    def _respond(start_response, status: str, body: dict):
+        encoded = json.dumps(body).encode()
+        start_response(
+            status,
+            [
+                ("Content-Type", "application/json"),
+                ("Content-Length", str(len(encoded))),
+            ],
+        )
+        return [encoded]
+
+    def serve(self, host: str = "0.0.0.0", port: int = 8000):
+        """Serve the host with a threaded WSGI server until interrupted."""
+        with make_server(host, port, self, server_class=_ThreadingWSGIServer) as server:
+            logger.info(
+                "Serving agents",
+                extra={"agent_count": len(self), "host": host, "port": port},
+            )
+            server.serve_forever()
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
@@ -0,0 +1,345 @@
+"""
+Staged processing of inbound envelopes.
+
+An InboundPipeline runs an envelope through a list of stages, cheapest
+first, and stops at the first stage that rejects it. Stages that only look at
+the size or the plain JSON fields of the envelope (target, digests, expiry)
+run before the signature is verified, so malformed, expired or unaddressed
+messages are dropped without paying for ECDSA verification. The payload of
+an accepted message is only decoded when it is first accessed, straight into
+the model registered for its schema digest if there is one (see
+fetchai.schema).
+
+A stage is any callable that takes an InboundEnvelope and returns None to
+accept it or a reason string to reject it.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Container, Dict, Iterable, List, Optional, Sequence
+
+from fetchai.communication import (
+    MAX_DECOMPRESSED_PAYLOAD_SIZE,
+    AgentMessage,
+    Envelope,
+    JsonStr,
+)
+from fetchai.schema import ModelRegistry, get_default_model_registry
+
+# Largest envelope accepted by default, in bytes
+DEFAULT_MAX_ENVELOPE_SIZE = 16 * 1024 * 1024
+
+_UNDECODED = object()
+
+
+class MessageRejected(ValueError):
+    """Raised when a stage of an InboundPipeline rejects an envelope."""
+
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"Message rejected by {stage}: {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+class InboundEnvelope:
+    """An inbound envelope as it moves through the pipeline, parsed on demand."""
+
+    def __init__(self, content: Any):
+        self.content = content
+        self._fields: Optional[Dict[str, Any]] = None
+        self._envelope: Optional[Envelope] = None
+
+    @property
+    def size(self) -> int:
+        """The size of the envelope in bytes."""
+        if isinstance(self.content, str) and not self.content.isascii():
+            return len(self.content.encode())
+        return len(self.content)
+
+    @property
+    def fields(self) -> Dict[str, Any]:
+        """The plain JSON fields of the envelope, without model validation."""
+        if self._fields is None:
+            fields = json.loads(self.content)
+            if not isinstance(fields, dict):
+                raise ValueError("Envelope is not a JSON object")
+            self._fields = fields
+        return self._fields
+
+    @property
+    def envelope(self) -> Envelope:
+        """The validated envelope model."""
+        if self._envelope is None:
+            if self._fields is not None:
+                self._envelope = Envelope.model_validate(self._fields)
+            else:
+                self._envelope = Envelope.model_validate_json(self.content)
+        return self._envelope
+
+
+class InboundMessage(AgentMessage):
+    """An AgentMessage whose payload is decoded on first access."""
+
+    def __init__(
+        self,
+        envelope: Envelope,
+        max_payload_size: int,
+        registry: Optional[ModelRegistry] = None,
+    ):
+        self._envelope = envelope
+        self._max_payload_size = max_payload_size
+        self._registry = registry
+        super().__init__(
+            sender=envelope.sender,
+            target=envelope.target,
+            payload=_UNDECODED,
+            session=envelope.session,
+        )
+
+    @property
+    def payload(self) -> Any:
+        if self._payload is _UNDECODED:
+            registry = self._registry or get_default_model_registry()
+            self._payload = registry.decode(
+                self._envelope.schema_digest,
+                self._envelope.decode_payload(self._max_payload_size),
+            )
+        return self._payload
+
+    @payload.setter
+    def payload(self, value: Any):
+        self._payload = value
+
+    @property
+    def envelope(self) -> Envelope:
+        return self._envelope
+
+
+Stage = Callable[[InboundEnvelope], Optional[str]]
+
+
+class SizeLimit:
+    name = "size_limit"
+
+    def __init__(self, max_size: int = DEFAULT_MAX_ENVELOPE_SIZE):
+        self.max_size = max_size
+
+    def __call__(self, inbound: InboundEnvelope) -> Optional[str]:
+        if inbound.size > self.max_size:
+            return f"envelope of {inbound.size} bytes exceeds {self.max_size} bytes"
+        return None
+
+
+class JsonCheck:
+    name = "json"
+
+    def __call__(self, inbound: InboundEnvelope) -> Optional[str]:
+        # parsed once here, the later stages read the cached fields
+        try:
+            inbound.fields
+        except ValueError as err:
+            return str(err)
+        return None
+
+
+class TargetAllowList:
+    name = "target_allow_list"
+
+    def __init__(self, targets: Container[str]):
+        """:param targets: The accepted target addresses, e.g. a set or an AgentHost"""
+        self.targets = targets
+
+    def __call__(self, inbound: InboundEnvelope) -> Optional[str]:
+        target = inbound.fields.get("target")
+        if target not in self.targets:
+            return f"target {target} is not accepted"
+        return None
+
+
+class DigestAllowList:
+    name = "digest_allow_list"
+
+    def __init__(
+        self,
+        schema_digests: Optional[Iterable[str]] = None,
+        protocol_digests: Optional[Iterable[str]] = None,
+    ):
+        """
+        :param schema_digests: The accepted model digests (any if omitted)
+        :param protocol_digests: The accepted protocol digests (any if omitted)
+        """
+        self.schema_digests = None if schema_digests is None else set(schema_digests)
+        self.protocol_digests = (
+            None if protocol_digests is None else set(protocol_digests)
+        )
+
+    def __call__(self, inbound: InboundEnvelope) -> Optional[str]:
+        fields = inbound.fields
+        schema_digest = fields.get("schema_digest")
+        if self.schema_digests is not None and schema_digest not in self.schema_digests:
+            return f"schema {schema_digest} is not accepted"
+        protocol_digest = fields.get("protocol_digest")
+        if (
+            self.protocol_digests is not None
+            and protocol_digest not in self.protocol_digests
+        ):
+            return f"protocol {protocol_digest} is not accepted"
+        return None
+
+
+class ExpiryCheck:
+    name = "expiry"
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+
+    def __call__(self, inbound: InboundEnvelope) -> Optional[str]:
+        expires = inbound.fields.get("expires")
+        if expires is not None and expires < self.clock():
+            return f"envelope expired at {expires}"
+        return None
+
+
+def _verify_envelope(env: Envelope) -> bool:
+    try:
+        return env.verify()
+    except Exception:
+        return False
+
+
+class SignatureCheck:
+    name = "signature"
+
+    def __init__(self, crypto_pool: Optional[Executor] = None):
+        """:param crypto_pool: Executor to verify signatures on (inline if omitted)"""
+        self.crypto_pool = crypto_pool
+
+    def __call__(self, inbound: InboundEnvelope) -> Optional[str]:
+        env = inbound.envelope
+        if self.crypto_pool is not None:
+            verified = self.crypto_pool.submit(_verify_envelope, env).result()
+        else:
+            verified = _verify_envelope(env)
+        if not verified:
+            return "invalid envelope signature"
+        return None
+
+
+class StageStats:
+    """Counters of a pipeline stage."""
+
+    def __init__(self):
+        self.passed = 0
+        self.rejected = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, passed: bool, seconds: float):
+        with self._lock:
+            if passed:
+                self.passed += 1
+            else:
+                self.rejected += 1
+            self.seconds += seconds
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "passed": self.passed,
+            "rejected": self.rejected,
+            "seconds": self.seconds,
+        }
+
+
+def _stage_name(stage: Stage) -> str:
+    return getattr(stage, "name", None) or getattr(stage, "__name__", repr(stage))
+
+
+class InboundPipeline:
+    """Validates inbound envelopes in stages, cheapest first."""
+
+    def __init__(
+        self,
+        stages: Optional[Sequence[Stage]] = None,
+        *,
+        max_size: int = DEFAULT_MAX_ENVELOPE_SIZE,
+        targets: Optional[Container[str]] = None,
+        schema_digests: Optional[Iterable[str]] = None,
+        protocol_digests: Optional[Iterable[str]] = None,
+        check_expiry: bool = True,
+        crypto_pool: Optional[Executor] = None,
+        max_payload_size: int = MAX_DECOMPRESSED_PAYLOAD_SIZE,
+        registry: Optional[ModelRegistry] = None,
+    ):
+        """
+        Create a pipeline from explicit stages, or from the standard stages
+        configured by the keyword arguments: size limit, JSON parsing, target
+        allow-list, digest allow-list, expiry and signature verification, in
+        that order.
+        :param stages: The stages to run, in order (replaces the standard stages)
+        :param max_size: The largest envelope accepted in bytes
+        :param targets: The accepted target addresses (any if omitted)
+        :param schema_digests: The accepted model digests (any if omitted)
+        :param protocol_digests: The accepted protocol digests (any if omitted)
+        :param check_expiry: Reject envelopes past their expiry time
+        :param crypto_pool: Executor to verify signatures on (inline if omitted)
+        :param max_payload_size: The largest size a compressed payload may expand to
+        :param registry: The models payloads are decoded into (defaults to the
+            shared registry)
+        """
+        if stages is None:
+            stages = [SizeLimit(max_size), JsonCheck()]
+            if targets is not None:
+                stages.append(TargetAllowList(targets))
+            if schema_digests is not None or protocol_digests is not None:
+                stages.append(DigestAllowList(schema_digests, protocol_digests))
+            if check_expiry:
+                stages.append(ExpiryCheck())
+            stages.append(SignatureCheck(crypto_pool))
+
+        self.stages: List[Stage] = list(stages)
+        self.max_payload_size = max_payload_size
+        self.registry = registry
+        self._stats: Dict[str, StageStats] = {
+            _stage_name(stage): StageStats() for stage in self.stages
+        }
+
+    @property
+    def max_size(self) -> Optional[int]:
+        """The largest envelope any size limit stage accepts, None without one."""
+        sizes = [
+            stage.max_size for stage in self.stages if isinstance(stage, SizeLimit)
+        ]
+        return min(sizes) if sizes else None
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """The passed/rejected counters and time spent of every stage, by stage name."""
+        return {name: stats.to_dict() for name, stats in self._stats.items()}
+
+    def process(self, content: JsonStr) -> InboundMessage:
+        """
+        Run an envelope through every stage.
+        :param content: The JSON envelope as str or bytes
+        :return: The accepted message, its payload is decoded on first access
+        :raises MessageRejected: If a stage rejects the envelope
+        """
+        inbound = InboundEnvelope(content)
+        for stage in self.stages:
+            name = _stage_name(stage)
+            start = time.perf_counter()
+            try:
+                reason = stage(inbound)
+            except (TypeError, ValueError) as err:
+                # malformed JSON or envelope fields
+                reason = str(err)
+            self._stats[name].record(reason is None, time.perf_counter() - start)
+            if reason is not None:
+                raise MessageRejected(name, reason)
+
+        try:
+            env = inbound.envelope
+        except ValueError as err:
+            raise MessageRejected("envelope", str(err)) from err
+        return InboundMessage(env, self.max_payload_size, self.registry)
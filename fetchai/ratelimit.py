@@ -0,0 +1,245 @@
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from fetchai.logging import logger
+
+# Number of host and route buckets a rate limiter keeps
+DEFAULT_MAX_BUCKETS = 1024
+
+# Delay in seconds used when a 429 response has no (valid) Retry-After header
+DEFAULT_RETRY_AFTER = 1.0
+
+# Path segments that identify a resource rather than a route, e.g. agent addresses
+_RESOURCE_SEGMENT = re.compile(
+    r"^(agent1[0-9a-z]+|user1[0-9a-z]+|[0-9a-f]{8}-[0-9a-f-]{27}|\d+)$"
+)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header, given in seconds or as an HTTP date, into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class TokenBucket:
+    """
+    A token bucket that hands out reservations, safe to share between threads
+    and asyncio tasks. A caller reserves a token and then waits for the
+    returned delay, so the lock is only held for the bookkeeping.
+
+    A bucket without a rate never delays requests, except while it is blocked
+    by a Retry-After. A bucket with a rate adapts to throttling: the rate is
+    halved on every 429 response and recovers additively on every success, up
+    to the configured rate.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float],
+        capacity: Optional[float] = None,
+        min_rate: float = 0.5,
+        recovery: float = 0.05,
+    ):
+        """
+        Create a new, full bucket.
+        :param rate: Tokens added per second, None for no limit
+        :param capacity: The largest burst allowed (defaults to one second worth of tokens)
+        :param min_rate: The rate never drops below this when throttled
+        :param recovery: Fraction of the configured rate regained per successful request
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate or 1.0)
+        self.min_rate = min_rate
+        self.recovery = recovery
+
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Reserve one token and return how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._blocked_until - now)
+            if self.rate is None:
+                return delay
+
+            # while blocked, _updated lies in the future and the tokens go into
+            # debt, so waiters are released one by one after the block ends
+            elapsed = now - self._updated
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens < 0:
+                delay = max(delay, -self._tokens / self.rate)
+            return delay
+
+    def _blocked(self) -> bool:
+        return self._blocked_until > time.monotonic()
+
+    def acquire(self):
+        """Block the calling thread until a token is available."""
+        delay = self.reserve()
+        while delay > 0:
+            time.sleep(delay)
+            # a 429 received while sleeping blocks reservations made before it
+            delay = self.reserve() if self._blocked() else 0.0
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until a token is available."""
+        delay = self.reserve()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.reserve() if self._blocked() else 0.0
+
+    def throttle(self, retry_after: Optional[float] = None):
+        """Back off after the server throttled a request."""
+        with self._lock:
+            now = time.monotonic()
+            delay = DEFAULT_RETRY_AFTER if retry_after is None else retry_after
+            self._blocked_until = max(self._blocked_until, now + delay)
+            if self.rate is not None:
+                elapsed = max(0.0, now - self._updated)
+                self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+                self.rate = max(self.min_rate, self.rate / 2)
+                # one request may go when the block ends, then tokens accrue
+                # at the reduced rate
+                self._tokens = min(self._tokens, 1.0)
+                self._updated = self._blocked_until
+
+    def succeed(self):
+        """Recover part of the configured rate after a successful request."""
+        if self.rate is None or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery)
+
+
+class RateLimiter:
+    """
+    Client side rate limiting with one token bucket per host and route.
+
+    Routes are the request path with resource identifiers, such as agent
+    addresses, replaced by a placeholder, so all lookups in the Almanac share
+    one bucket. The rate of a bucket is taken from the longest matching URL
+    prefix in `rates`. By default no route has a fixed rate, routes are only
+    limited while a Retry-After of the server is in effect. Only the most recently used buckets are kept, as
+    every agent endpoint gets a bucket of its own.
+    """
+
+    def __init__(
+        self,
+        rates: Optional[Mapping[str, float]] = None,
+        default_rate: Optional[float] = None,
+        max_buckets: int = DEFAULT_MAX_BUCKETS,
+    ):
+        """
+        Create a new rate limiter.
+        :param rates: Requests per second by URL prefix (none if omitted)
+        :param default_rate: Requests per second for routes without a matching prefix
+        :param max_buckets: The number of host and route buckets kept
+        """
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.max_buckets = max_buckets
+
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def route(url: str) -> Tuple[str, str]:
+        """The (host, route) key the url is limited under."""
+        parts = urlsplit(url)
+        segments = [
+            "{id}" if _RESOURCE_SEGMENT.match(segment) else segment
+            for segment in parts.path.split("/")
+        ]
+        return parts.netloc, "/".join(segments)
+
+    def _rate_for(self, url: str) -> Optional[float]:
+        matches = [prefix for prefix in self.rates if url.startswith(prefix)]
+        if not matches:
+            return self.default_rate
+        return self.rates[max(matches, key=len)]
+
+    def bucket(self, url: str) -> TokenBucket:
+        key = self.route(url)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                self._buckets.move_to_end(key)
+                return bucket
+
+            bucket = TokenBucket(self._rate_for(url))
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return bucket
+
+    def acquire(self, url: str):
+        self.bucket(url).acquire()
+
+    async def acquire_async(self, url: str):
+        await self.bucket(url).acquire_async()
+
+    def update(self, url: str, status_code: int, headers: Mapping[str, str]) -> bool:
+        """
+        Adapt the bucket of the url to the response of a request.
+        :return: True if the request was throttled and can be retried
+        """
+        bucket = self.bucket(url)
+        if status_code == 429:
+            retry_after = parse_retry_after(headers.get("retry-after"))
+            logger.info(
+                "Request throttled by server",
+                extra={"url": url, "retry_after": retry_after},
+            )
+            bucket.throttle(retry_after)
+            return True
+
+        if status_code == 503 and "retry-after" in headers:
+            bucket.throttle(parse_retry_after(headers.get("retry-after")))
+            return False
+
+        if 200 <= status_code < 300:
+            bucket.succeed()
+        return False
+
+
+_default_rate_limiter: Optional[RateLimiter] = None
+_default_rate_limiter_lock = threading.Lock()
+
+
+def get_default_rate_limiter() -> RateLimiter:
+    """Return the process wide rate limiter shared by all transports by default."""
+    global _default_rate_limiter
+    if _default_rate_limiter is None:
+        with _default_rate_limiter_lock:
+            if _default_rate_limiter is None:
+                _default_rate_limiter = RateLimiter()
+    return _default_rate_limiter
+
+
+def set_default_rate_limiter(rate_limiter: RateLimiter):
+    """Replace the process wide rate limiter, e.g. to change the rates."""
+    global _default_rate_limiter
+    with _default_rate_limiter_lock:
+        _default_rate_limiter = rate_limiter
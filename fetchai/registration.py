@@ -1,17 +1,23 @@
 import hashlib
+import itertools
 import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 
-import requests
-from typing import Optional, Union, List, Dict
+from typing import Optional, Union, List, Dict, Iterable, Tuple
 from pydantic import BaseModel
 
-from fetchai.crypto import Identity
+from fetchai.crypto import Identity, encode_length_prefixed
 from fetchai.logging import logger
-
+from fetchai.transport import Transport, get_default_transport
 
 DEFAULT_AGENTVERSE_URL = "https://agentverse.ai"
 DEFAULT_ALMANAC_API_URL = DEFAULT_AGENTVERSE_URL + "/v1/almanac"
 DEFAULT_MAILBOX_API_URL = DEFAULT_AGENTVERSE_URL + "/v1/agents"
+DEFAULT_SEARCH_API_URL = DEFAULT_AGENTVERSE_URL + "/v1/search"
+
+# Attestations submitted to the Almanac in one request by batch registrations
+DEFAULT_REGISTRATION_BATCH_SIZE = 1000
 
 
 class AgentEndpoint(BaseModel):
@@ -56,86 +62,79 @@ class AgentRegistrationAttestation(BaseModel):
         return sha256.digest()
 
 
-def register_with_agentverse(
-    identity: Identity,
-    url: str,
-    agentverse_token: str,
-    agent_title: str,
-    readme: str,
-    *,
-    protocol_digest: Optional[
-        str
-    ] = "proto:a03398ea81d7aaaf67e72940937676eae0d019f8e1d8b5efbadfef9fd2e98bb2",
-    almanac_api: Optional[str] = None,
-):
+class AgentRegistrationAttestationBatch(BaseModel):
+    attestations: List[AgentRegistrationAttestation]
+
+
+@dataclass
+class RegistrationResult:
+    # The digest of the registered title and readme, see readme_digest.
+    readme_digest: str
+    # Whether the title and readme were uploaded, False if they were unchanged.
+    readme_uploaded: bool
+
+
+def readme_digest(readme: str, agent_title: Optional[str] = None) -> str:
     """
-    Register the agent with the Agentverse API.
-    :param identity: The identity of the agent.
-    :param url: The URL endpoint for the agent
-    :param protocol_digest: The digest of the protocol that the agent supports
-    :param agentverse_token: The token to use to authenticate with the Agentverse API
-    :param agent_title: The title of the agent
-    :param readme: The readme for the agent
-    :param almanac_api: The URL of the Almanac API (if different from the default)
-    :return:
+    Content hash of a readme and, optionally, the title it is published under.
+    Used to skip uploading a readme that has not changed since the last registration.
     """
-    almanac_api = almanac_api or DEFAULT_ALMANAC_API_URL
+    hasher = hashlib.sha256()
+    if agent_title is not None:
+        hasher.update(encode_length_prefixed(agent_title))
+    hasher.update(readme.encode())
+    return hasher.hexdigest()
 
-    agent_address = identity.address
-    registration_metadata = {
-        "almanac_endpoint": almanac_api,
-        "agent_title": agent_title,
-        "agent_address": agent_address,
-        "agent_endpoint": url,
-        "protocol_digest": protocol_digest,
-    }
-    logger.info(
-        "Registering with Almanac API",
-        extra=registration_metadata,
-    )
 
-    # create the attestation
+def _create_attestation(
+    identity: Identity, url: str, protocol_digest: Optional[str]
+) -> AgentRegistrationAttestation:
     attestation = AgentRegistrationAttestation(
-        agent_address=agent_address,
+        agent_address=identity.address,
         protocols=[protocol_digest],
         endpoints=[
             AgentEndpoint(url=url, weight=1),
         ],
         metadata=None,
     )
-
-    # sign the attestation
     attestation.sign(identity)
+    return attestation
 
-    # submit the attestation to the API
-    r = requests.post(
-        f"{almanac_api}/agents",
-        headers={"content-type": "application/json"},
-        data=attestation.model_dump_json(),
-    )
-    r.raise_for_status()
-    logger.debug(
-        "Agent attestation submitted",
-        extra=registration_metadata,
-    )
 
+def _register_with_mailbox(
+    agent_address: str,
+    agentverse_token: str,
+    agent_title: str,
+    readme: str,
+    *,
+    mailbox_api: str,
+    transport: Transport,
+    previous_readme_digest: Optional[str],
+    registration_metadata: Dict[str, Optional[str]],
+) -> RegistrationResult:
+    """Create the agent in the Agentverse if needed and upload its title and readme."""
     # check to see if the agent exists
-    r = requests.get(
-        f"{DEFAULT_MAILBOX_API_URL}/{agent_address}",
+    r = transport.get(
+        f"{mailbox_api}/{agent_address}",
         headers={
             "content-type": "application/json",
             "authorization": f"Bearer {agentverse_token}",
         },
     )
 
-    # if it doesn't then create it
-    if r.status_code == 404:
+    digest = readme_digest(readme, agent_title)
+
+    # if it doesn't then create it, any other error (e.g. a bad token) is raised
+    agent_exists = r.status_code != 404
+    if agent_exists:
+        r.raise_for_status()
+    else:
         logger.debug(
             "Agent did not exist on agentverse; registering it",
             extra=registration_metadata,
         )
-        r = requests.post(
-            f"{DEFAULT_MAILBOX_API_URL}/",
+        r = transport.post(
+            f"{mailbox_api}/",
             headers={
                 "content-type": "application/json",
                 "authorization": f"Bearer {agentverse_token}",
@@ -147,13 +146,20 @@ def register_with_agentverse(
         )
         r.raise_for_status()
 
+    if agent_exists and r.status_code == 200 and digest == previous_readme_digest:
+        logger.info(
+            "Agent title and readme unchanged; completed registering agent",
+            extra=registration_metadata,
+        )
+        return RegistrationResult(digest, readme_uploaded=False)
+
     # update the readme and the title of the agent to make it easier to find
     logger.debug(
         "Registering agent title and readme with Agentverse",
         extra=registration_metadata,
     )
-    r = requests.put(
-        f"{DEFAULT_MAILBOX_API_URL}/{agent_address}",
+    r = transport.put(
+        f"{mailbox_api}/{agent_address}",
         headers={
             "content-type": "application/json",
             "authorization": f"Bearer {agentverse_token}",
@@ -168,3 +174,179 @@ def register_with_agentverse(
         "Completed registering agent with Agentverse",
         extra=registration_metadata,
     )
+    return RegistrationResult(digest, readme_uploaded=True)
+
+
+def register_with_agentverse(
+    identity: Identity,
+    url: str,
+    agentverse_token: str,
+    agent_title: str,
+    readme: str,
+    *,
+    protocol_digest: Optional[
+        str
+    ] = "proto:a03398ea81d7aaaf67e72940937676eae0d019f8e1d8b5efbadfef9fd2e98bb2",
+    almanac_api: Optional[str] = None,
+    mailbox_api: Optional[str] = None,
+    transport: Optional[Transport] = None,
+    previous_readme_digest: Optional[str] = None,
+) -> RegistrationResult:
+    """
+    Register the agent with the Agentverse API.
+    :param identity: The identity of the agent.
+    :param url: The URL endpoint for the agent
+    :param protocol_digest: The digest of the protocol that the agent supports
+    :param agentverse_token: The token to use to authenticate with the Agentverse API
+    :param agent_title: The title of the agent
+    :param readme: The readme for the agent
+    :param almanac_api: The URL of the Almanac API (if different from the default)
+    :param mailbox_api: The URL of the Agentverse agents API (if different from the default)
+    :param transport: The HTTP transport to use (defaults to the shared transport)
+    :param previous_readme_digest: The digest returned by the last registration of
+        this agent, the title and readme are not uploaded again if they are unchanged
+    :return: The digest of the registered title and readme, and whether they
+        were uploaded or skipped as unchanged
+    """
+    almanac_api = almanac_api or DEFAULT_ALMANAC_API_URL
+    mailbox_api = mailbox_api or DEFAULT_MAILBOX_API_URL
+    transport = transport or get_default_transport()
+
+    agent_address = identity.address
+    registration_metadata = {
+        "almanac_endpoint": almanac_api,
+        "agent_title": agent_title,
+        "agent_address": agent_address,
+        "agent_endpoint": url,
+        "protocol_digest": protocol_digest,
+    }
+    logger.info(
+        "Registering with Almanac API",
+        extra=registration_metadata,
+    )
+
+    # create and sign the attestation
+    attestation = _create_attestation(identity, url, protocol_digest)
+
+    # submit the attestation to the API
+    r = transport.post(
+        f"{almanac_api}/agents",
+        headers={"content-type": "application/json"},
+        content=attestation.model_dump_json(),
+    )
+    r.raise_for_status()
+    logger.debug(
+        "Agent attestation submitted",
+        extra=registration_metadata,
+    )
+
+    return _register_with_mailbox(
+        agent_address,
+        agentverse_token,
+        agent_title,
+        readme,
+        mailbox_api=mailbox_api,
+        transport=transport,
+        previous_readme_digest=previous_readme_digest,
+        registration_metadata=registration_metadata,
+    )
+
+
+def register_batch_with_agentverse(
+    agents: Iterable[Tuple[Identity, str, str]],
+    url: str,
+    agentverse_token: str,
+    *,
+    protocol_digest: Optional[
+        str
+    ] = "proto:a03398ea81d7aaaf67e72940937676eae0d019f8e1d8b5efbadfef9fd2e98bb2",
+    almanac_api: Optional[str] = None,
+    mailbox_api: Optional[str] = None,
+    transport: Optional[Transport] = None,
+    max_workers: int = 8,
+    batch_size: int = DEFAULT_REGISTRATION_BATCH_SIZE,
+) -> Dict[str, Exception]:
+    """
+    Register many agents that share one endpoint with the Agentverse API.
+    The attestations of up to batch_size agents are submitted to the Almanac
+    in one request, then the agents are created and their readmes uploaded
+    concurrently over one shared transport. A failure of one agent does not
+    stop the others.
+    :param agents: (identity, title, readme) of every agent to register
+    :param url: The URL endpoint shared by the agents
+    :param agentverse_token: The token to use to authenticate with the Agentverse API
+    :param protocol_digest: The digest of the protocol that the agents support
+    :param almanac_api: The URL of the Almanac API (if different from the default)
+    :param mailbox_api: The URL of the Agentverse agents API (if different from the default)
+    :param transport: The HTTP transport to use (defaults to the shared transport)
+    :param max_workers: The number of Agentverse registrations in flight at once
+    :param batch_size: The number of attestations submitted per Almanac request
+    :return: The error of every agent that failed to register, by address
+    """
+    almanac_api = almanac_api or DEFAULT_ALMANAC_API_URL
+    mailbox_api = mailbox_api or DEFAULT_MAILBOX_API_URL
+    transport = transport or get_default_transport()
+
+    def _register(agent: Tuple[Identity, str, str]) -> Tuple[str, Optional[Exception]]:
+        identity, agent_title, readme = agent
+        try:
+            _register_with_mailbox(
+                identity.address,
+                agentverse_token,
+                agent_title,
+                readme,
+                mailbox_api=mailbox_api,
+                transport=transport,
+                previous_readme_digest=None,
+                registration_metadata={
+                    "agent_title": agent_title,
+                    "agent_address": identity.address,
+                    "agent_endpoint": url,
+                },
+            )
+        except Exception as err:
+            logger.warning(
+                "Failed to register agent",
+                extra={"agent_address": identity.address, "error": str(err)},
+            )
+            return identity.address, err
+        return identity.address, None
+
+    # registered batch by batch so that identities are only held while being registered
+    failures: Dict[str, Exception] = {}
+    pending = iter(agents)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            batch = list(itertools.islice(pending, batch_size))
+            if not batch:
+                break
+
+            attestations = AgentRegistrationAttestationBatch(
+                attestations=[
+                    _create_attestation(identity, url, protocol_digest)
+                    for identity, _, _ in batch
+                ]
+            )
+            logger.info(
+                "Registering batch with Almanac API",
+                extra={"almanac_endpoint": almanac_api, "agents": len(batch)},
+            )
+            try:
+                r = transport.post(
+                    f"{almanac_api}/agents/batch",
+                    headers={"content-type": "application/json"},
+                    content=attestations.model_dump_json(),
+                )
+                r.raise_for_status()
+            except Exception as err:
+                logger.warning(
+                    "Failed to submit agent attestations",
+                    extra={"agents": len(batch), "error": str(err)},
+                )
+                failures.update((identity.address, err) for identity, _, _ in batch)
+                continue
+
+            for address, err in executor.map(_register, batch):
+                if err is not None:
+                    failures[address] = err
+    return failures
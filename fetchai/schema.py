@@ -0,0 +1,155 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from pydantic.v1 import BaseModel as BaseModelV1
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _is_msgspec_model(model: type) -> bool:
+    return msgspec is not None and issubclass(model, msgspec.Struct)
+
+
+def is_model_type(model: Any) -> bool:
+    """Whether the value is a pydantic (v1 or v2) or msgspec model class."""
+    return isinstance(model, type) and (
+        issubclass(model, (BaseModel, BaseModelV1)) or _is_msgspec_model(model)
+    )
+
+
+def is_model(value: Any) -> bool:
+    """Whether the value is an instance of a pydantic (v1 or v2) or msgspec model."""
+    return is_model_type(type(value))
+
+
+def compute_model_digest(model: Type) -> str:
+    """
+    Compute the schema digest of a model the way uAgents does: the sha256 of
+    the model's JSON schema serialised with sorted keys, prefixed with "model:".
+
+    uAgents models are pydantic v1 models, for those (including models built
+    on pydantic.v1) the digest is identical. Pydantic v2 and msgspec models
+    are digested from their own JSON schema, which matches uAgents for models
+    whose schema is the same in both versions, such as models with only
+    required fields of basic types.
+    """
+    if issubclass(model, BaseModelV1):
+        schema = model.schema_json(indent=None, sort_keys=True)
+    elif issubclass(model, BaseModel):
+        schema = json.dumps(model.model_json_schema(), indent=None, sort_keys=True)
+    elif _is_msgspec_model(model):
+        schema = json.dumps(msgspec.json.schema(model), indent=None, sort_keys=True)
+    else:
+        raise ValueError(f"{model!r} is not a pydantic or msgspec model")
+
+    digest = hashlib.sha256(schema.encode("utf8")).digest().hex()
+    return f"model:{digest}"
+
+
+class ModelRegistry:
+    """
+    Maps schema digests to payload models.
+
+    Payloads of envelopes whose schema digest is registered are decoded
+    straight from their JSON into the model in a single validation pass,
+    and model instances sent as payloads are serialised by their model and
+    sent with its digest.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, Type] = {}
+        self._digests: Dict[Type, str] = {}
+        self._lock = threading.Lock()
+
+    def register(self, model: Type, digest: Optional[str] = None) -> Type:
+        """
+        Register a model, can be used as a class decorator.
+        :param model: The pydantic or msgspec model class
+        :param digest: The schema digest of the model (computed if omitted)
+        :return: The model
+        """
+        if not is_model_type(model):
+            raise ValueError(f"{model!r} is not a pydantic or msgspec model")
+
+        digest = digest or compute_model_digest(model)
+        with self._lock:
+            self._models[digest] = model
+            self._digests[model] = digest
+        return model
+
+    def unregister(self, model: Type):
+        with self._lock:
+            digest = self._digests.pop(model, None)
+            if digest is not None and self._models.get(digest) is model:
+                del self._models[digest]
+
+    def model_for(self, digest: str) -> Optional[Type]:
+        """The model registered for a schema digest."""
+        return self._models.get(digest)
+
+    def digest_for(self, model: Any) -> str:
+        """The schema digest of a model class or instance, registered or not."""
+        model = model if isinstance(model, type) else type(model)
+        digest = self._digests.get(model)
+        if digest is None:
+            digest = compute_model_digest(model)
+            with self._lock:
+                self._digests.setdefault(model, digest)
+        return digest
+
+    def decode(self, digest: str, json_payload: str) -> Any:
+        """
+        Decode a JSON payload into the model registered for its schema digest,
+        or into plain JSON values if no model is registered.
+        """
+        model = self._models.get(digest)
+        if model is None:
+            return json.loads(json_payload)
+        if issubclass(model, BaseModelV1):
+            return model.parse_raw(json_payload)
+        if issubclass(model, BaseModel):
+            return model.model_validate_json(json_payload)
+        try:
+            return msgspec.json.decode(json_payload, type=model)
+        except msgspec.ValidationError as err:
+            raise ValueError(str(err)) from err
+
+    def encode(self, payload: Any) -> Tuple[str, Optional[str]]:
+        """
+        Serialise a payload to compact JSON.
+        :return: The JSON and, for model instances, the schema digest of the model
+        """
+        if isinstance(payload, BaseModelV1):
+            return payload.json(separators=(",", ":")), self.digest_for(payload)
+        if isinstance(payload, BaseModel):
+            return payload.model_dump_json(), self.digest_for(payload)
+        if is_model(payload):
+            return msgspec.json.encode(payload).decode(), self.digest_for(payload)
+        return json.dumps(payload, separators=(",", ":")), None
+
+
+_default_registry = ModelRegistry()
+_default_registry_lock = threading.Lock()
+
+
+def get_default_model_registry() -> ModelRegistry:
+    """Return the process wide registry used when no registry is passed."""
+    return _default_registry
+
+
+def set_default_model_registry(registry: ModelRegistry):
+    """Replace the process wide registry."""
+    global _default_registry
+    with _default_registry_lock:
+        _default_registry = registry
+
+
+def register_model(model: Type, digest: Optional[str] = None) -> Type:
+    """Register a model with the default registry, can be used as a class decorator."""
+    return get_default_model_registry().register(model, digest)
@@ -0,0 +1,275 @@
+"""
+Pipelined sending of outbound messages.
+
+A PipelinedSender splits sending into a CPU-bound and an I/O-bound stage:
+envelopes are signed in a process pool while an asyncio loop, running in a
+background thread, posts already signed envelopes to their targets. Both
+stages run at the same time, so sustained outbound traffic keeps every core
+busy signing while the network is kept busy posting.
+
+The stages are connected by bounded queues. When the I/O stage falls behind,
+signed envelopes wait for a slot in its queue, which holds back the signing
+stage, which in turn blocks submit() until there is room again.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+import httpx
+
+from fetchai.communication import (
+    Envelope,
+    _EndpointCache,
+    _post_envelope_async,
+    _prepare_envelope,
+)
+from fetchai.crypto import Identity
+from fetchai.logging import logger
+from fetchai.registration import DEFAULT_ALMANAC_API_URL
+from fetchai.transport import AsyncTransport
+
+# Identities of the senders registered with a worker process, by address.
+# Messages only carry the address of their sender, a private key is only sent
+# along when a worker does not know the sender yet.
+_worker_identities: Dict[str, Identity] = {}
+
+
+def _register_senders(private_keys: Iterable[str]):
+    """Register sender identities with a worker process, runs in the worker."""
+    for private_key in private_keys:
+        identity = Identity.from_string(private_key)
+        _worker_identities[identity.address] = identity
+
+
+def _sign_digest(address: str, digest: bytes) -> Optional[str]:
+    """
+    Sign an envelope digest, runs in a worker process.
+    :return: The signature, None if the sender is not registered with the worker
+    """
+    identity = _worker_identities.get(address)
+    return None if identity is None else identity.sign_digest(digest)
+
+
+def _register_and_sign_digest(private_key: str, digest: bytes) -> str:
+    """Register a sender with a worker process and sign an envelope digest."""
+    identity = Identity.from_string(private_key)
+    _worker_identities[identity.address] = identity
+    return identity.sign_digest(digest)
+
+
+class PipelinedSender:
+    """Sends messages through a signing process pool and an asyncio I/O stage."""
+
+    def __init__(
+        self,
+        *,
+        workers: Optional[int] = None,
+        senders: Iterable[Identity] = (),
+        signing_pool: Optional[Executor] = None,
+        signing_queue_size: Optional[int] = None,
+        queue_size: int = 256,
+        concurrency: int = 32,
+        almanac_api: Optional[str] = None,
+        transport: Optional[AsyncTransport] = None,
+    ):
+        """
+        Create a new sender, its worker processes and I/O thread start right away.
+        :param workers: The number of signing processes (defaults to the number of CPUs)
+        :param senders: Identities registered with every signing process up front,
+            the key of any other sender is sent to a process when it first signs for it
+        :param signing_pool: Executor to sign on instead of a new process pool,
+            it is not shut down by close()
+        :param signing_queue_size: The number of envelopes waiting for or being
+            signed (defaults to four per worker)
+        :param queue_size: The number of signed envelopes waiting to be posted
+        :param concurrency: The number of envelopes posted at the same time
+        :param almanac_api: The URL of the Almanac API (if different from the default)
+        :param transport: The async HTTP transport to post with (a new one is
+            created if omitted, sized for the concurrency)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.concurrency = concurrency
+        self.almanac_api = almanac_api or DEFAULT_ALMANAC_API_URL
+
+        self._owns_pool = signing_pool is None
+        self._pool = signing_pool or ProcessPoolExecutor(
+            self.workers,
+            initializer=_register_senders,
+            initargs=([identity.private_key for identity in senders],),
+        )
+        self._sign_slots = threading.BoundedSemaphore(
+            signing_queue_size or self.workers * 4
+        )
+        self._transport = transport or AsyncTransport(pool_size=concurrency)
+        self._endpoints = _EndpointCache(self.almanac_api, self._transport)
+        self._closed = False
+        self._signing = 0
+        self._signing_done = threading.Condition()
+
+        self._loop = asyncio.new_event_loop()
+        self._queue: "asyncio.Queue[Optional[Tuple[Envelope, Future]]]" = (
+            self._loop.run_until_complete(self._create_queue(queue_size))
+        )
+        self._posters: List["asyncio.Task[None]"] = []
+        self._thread = threading.Thread(
+            target=self._run_loop, name="fetchai-sender", daemon=True
+        )
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start_posters(), self._loop).result()
+
+    @staticmethod
+    async def _create_queue(queue_size: int) -> asyncio.Queue:
+        # created inside the loop, older Pythons bind queues to the current loop
+        return asyncio.Queue(queue_size)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _start_posters(self):
+        self._posters = [
+            asyncio.ensure_future(self._poster()) for _ in range(self.concurrency)
+        ]
+
+    def submit(
+        self,
+        sender: Identity,
+        target: str,
+        payload: Any,
+        *,
+        session: Optional[UUID] = None,
+        # The default protocol for AI to AI conversation, use for standard chat
+        protocol_digest: Optional[
+            str
+        ] = "proto:a03398ea81d7aaaf67e72940937676eae0d019f8e1d8b5efbadfef9fd2e98bb2",
+        # Derived from the payload model, or the default chat model for plain payloads
+        model_digest: Optional[str] = None,
+        compression: Optional[str] = None,
+    ) -> "Future[None]":
+        """
+        Queue a message for sending, blocks while the pipeline is full.
+        :param sender: The identity of the sender.
+        :param target: The address of the target agent.
+        :param payload: The payload of the message, JSON values or a model instance
+        :param session: The session of the message (a new one is created if omitted)
+        :param protocol_digest: The digest of the protocol that is being used
+        :param model_digest: The digest of the model that is being used
+        :param compression: Compress large payloads with "gzip" or "zstd"
+        :return: A future that completes once the message was delivered, or
+            fails with the error that prevented it
+        """
+        env = _prepare_envelope(
+            sender.address,
+            target,
+            payload,
+            session or uuid4(),
+            protocol_digest,
+            model_digest,
+            compression=compression,
+        )
+
+        future: "Future[None]" = Future()
+        self._sign_slots.acquire()
+        with self._signing_done:
+            if self._closed:
+                self._sign_slots.release()
+                raise ValueError("Sender is closed")
+            self._signing += 1
+        try:
+            signing = self._pool.submit(_sign_digest, sender.address, env._digest())
+        except BaseException:
+            self._release_slot()
+            raise
+        signing.add_done_callback(lambda done: self._signed(done, sender, env, future))
+        return future
+
+    def _release_slot(self):
+        self._sign_slots.release()
+        with self._signing_done:
+            self._signing -= 1
+            self._signing_done.notify_all()
+
+    def _signed(self, signing: Future, sender: Identity, env: Envelope, future: Future):
+        # runs on the thread that completed the signing future
+        try:
+            signature = signing.result()
+            if signature is None:
+                # the worker did not know the sender yet, sign again with its key
+                signing = self._pool.submit(
+                    _register_and_sign_digest, sender.private_key, env._digest()
+                )
+                signing.add_done_callback(
+                    lambda done: self._signed(done, sender, env, future)
+                )
+                return
+        except Exception as err:
+            self._release_slot()
+            future.set_exception(ValueError(f"Failed to sign envelope: {err}"))
+            return
+        env.signature = signature
+        asyncio.run_coroutine_threadsafe(self._enqueue(env, future), self._loop)
+
+    async def _enqueue(self, env: Envelope, future: Future):
+        # the signing slot is only freed once the envelope fits into the queue
+        await self._queue.put((env, future))
+        self._release_slot()
+
+    async def _poster(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                if item is None:
+                    return
+                env, future = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    endpoint = await self._endpoints.get(env.target)
+                    await _post_envelope_async(endpoint, env, self._transport)
+                except Exception as err:
+                    if isinstance(err, httpx.HTTPError):
+                        # the agent may have moved, look it up again next time
+                        self._endpoints.invalidate(env.target)
+                    logger.warning(
+                        "Failed to send message to agent",
+                        extra={"agent_address": env.target, "error": str(err)},
+                    )
+                    future.set_exception(err)
+                else:
+                    future.set_result(None)
+            finally:
+                self._queue.task_done()
+
+    async def _drain(self):
+        for _ in self._posters:
+            await self._queue.put(None)
+        await asyncio.gather(*self._posters)
+        await self._transport.aclose()
+
+    def close(self):
+        """Send every queued message, then stop the pipeline."""
+        with self._signing_done:
+            if self._closed:
+                return
+            self._closed = True
+            # wait for every accepted message to reach the I/O queue
+            while self._signing:
+                self._signing_done.wait()
+
+        if self._owns_pool:
+            self._pool.shutdown()
+
+        asyncio.run_coroutine_threadsafe(self._drain(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "PipelinedSender":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
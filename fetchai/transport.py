@@ -0,0 +1,237 @@
+import asyncio
+import threading
+import time
+from typing import Optional, Tuple
+
+import httpx
+
+from fetchai.logging import logger
+from fetchai.ratelimit import RateLimiter, get_default_rate_limiter
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_POOL_SIZE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 5.0
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_STATUSES = (502, 503, 504)
+
+# Only requests that are safe to repeat are retried after a response was received
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class _BaseTransport:
+    def __init__(
+        self,
+        *,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = DEFAULT_KEEPALIVE_EXPIRY,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        retry_statuses: Tuple[int, ...] = DEFAULT_RETRY_STATUSES,
+        backoff: float = 0.1,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        """
+        Create a new transport, the underlying connection pool is created on first use.
+        :param pool_size: The maximum number of concurrent connections
+        :param keepalive_connections: The maximum number of idle connections kept
+            alive (defaults to pool_size)
+        :param keepalive_expiry: Seconds an idle connection is kept alive
+        :param timeout: Connect, read and write timeout in seconds (None disables it)
+        :param retries: How often a failed request is retried. Connection failures
+            and throttled (429) requests are retried for every request,
+            retry_statuses only for idempotent ones
+        :param retry_statuses: Response status codes that trigger a retry
+        :param backoff: Initial delay in seconds between retries, doubled every attempt
+        :param rate_limiter: The client side rate limiter (defaults to the shared limiter)
+        """
+        self.pool_size = pool_size
+        self.keepalive_connections = (
+            pool_size if keepalive_connections is None else keepalive_connections
+        )
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_statuses = retry_statuses
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter or get_default_rate_limiter()
+
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def _retry_delay(
+        self, method: str, url: str, response: httpx.Response, attempt: int
+    ) -> Optional[float]:
+        """How long to wait before retrying the request, None if it should not be retried."""
+        throttled = self.rate_limiter.update(
+            url, response.status_code, response.headers
+        )
+        if attempt >= self.retries:
+            return None
+        if throttled:
+            # the rate limiter holds the next attempt back until Retry-After
+            delay = 0.0
+        elif (
+            response.status_code in self.retry_statuses and method in IDEMPOTENT_METHODS
+        ):
+            delay = self.backoff * (2**attempt)
+        else:
+            return None
+
+        logger.debug(
+            "Retrying request",
+            extra={
+                "method": method,
+                "url": url,
+                "response_status": response.status_code,
+                "retry_delay": delay,
+            },
+        )
+        return delay
+
+
+class Transport(_BaseTransport):
+    """
+    A thread-safe HTTP transport shared by the sync API.
+
+    All requests go through one pooled httpx client, so threads (for example
+    the workers of a multi-threaded WSGI server) reuse keep-alive connections
+    to the Almanac, Agentverse and agent endpoints instead of opening a new
+    connection per call. Requests are paced by a client side rate limiter
+    that backs off when the server answers 429 Too Many Requests.
+    """
+
+    @property
+    def client(self) -> httpx.Client:
+        """The pooled httpx client used by this transport."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        transport=httpx.HTTPTransport(
+                            limits=self._limits(), retries=self.retries
+                        ),
+                        timeout=self.timeout,
+                    )
+        return self._client
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying retryable responses with exponential backoff."""
+        method = method.upper()
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(url)
+            response = self.client.request(method, url, **kwargs)
+            delay = self._retry_delay(method, url, response, attempt)
+            if delay is None:
+                return response
+
+            response.close()
+            if delay:
+                time.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def __enter__(self) -> "Transport":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncTransport(_BaseTransport):
+    """
+    The asyncio counterpart of Transport, for use from a single event loop.
+    It accepts the same options and shares the rate limiter with the sync
+    transports by default, so both respect the same limits.
+    """
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled httpx client used by this transport."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(
+                    limits=self._limits(), retries=self.retries
+                ),
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying retryable responses with exponential backoff."""
+        method = method.upper()
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire_async(url)
+            response = await self.client.request(method, url, **kwargs)
+            delay = self._retry_delay(method, url, response, attempt)
+            if delay is None:
+                return response
+
+            await response.aclose()
+            if delay:
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "AsyncTransport":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+_default_transport: Optional[Transport] = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport() -> Transport:
+    """Return the process wide transport used when no transport is passed."""
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = Transport()
+    return _default_transport
+
+
+def set_default_transport(transport: Transport):
+    """Replace the process wide transport, e.g. to tune its pool size or timeouts."""
+    global _default_transport
+    with _default_transport_lock:
+        _default_transport = transport
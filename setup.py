@@ -3,12 +3,13 @@ from setuptools import setup, find_packages
 setup(
     name="fetchai",
     version="0.1.18",
-    packages=find_packages(),  # Automatically find all packages in the folder
+    packages=find_packages(
+        exclude=["benchmarks", "benchmarks.*", "tests", "tests.*"]
+    ),  # Automatically find all packages in the folder
     install_requires=[
         "bech32>=1.2.0,<2.0",
         "ecdsa>=0.19.0,<1.0",
         "pydantic>=2.7.4,<3.0",
-        "requests>=2.32.3,<3.0",
         "httpx>=0.23.0,<1.0",
         "mnemonic>=0.21",
         "click>=8.1.2,<9.0",
@@ -22,6 +23,16 @@ setup(
     extras_require={
         "dev": [
             "black",
+            "pytest",
+        ],
+        "yaml": [
+            "PyYAML>=6.0",
+        ],
+        "msgspec": [
+            "msgspec>=0.18.0",
+        ],
+        "zstd": [
+            "zstandard>=0.22.0",
         ],
     },
     description="Find the right AI at the right time and register your AI to be discovered.",
@@ -0,0 +1,85 @@
+import os
+import stat
+
+import pytest
+
+from benchmarks.mock_agentverse import MockAgentverse
+from benchmarks.scenarios import BENCHMARK_SEED
+from fetchai import almanac
+from fetchai.almanac import (
+    SNAPSHOT_ENV_VAR,
+    AlmanacSnapshot,
+    build_almanac_snapshot,
+    get_default_almanac_snapshot,
+)
+from fetchai.crypto import Identity
+
+AGENT = Identity.from_seed(BENCHMARK_SEED, 1).address
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    with MockAgentverse() as server:
+        path = str(tmp_path / "almanac.db")
+        build_almanac_snapshot(
+            path,
+            [AGENT],
+            almanac_api=server.almanac_api,
+        )
+        yield path, server
+
+
+@pytest.fixture
+def default_snapshot(monkeypatch):
+    # every test starts without a loaded default snapshot
+    monkeypatch.setattr(almanac, "_default_snapshot", None)
+    monkeypatch.setattr(almanac, "_default_snapshot_loaded", False)
+
+
+def test_snapshot_answers_lookups(snapshot_path):
+    path, server = snapshot_path
+    snapshot = AlmanacSnapshot(path)
+
+    assert snapshot.lookup(AGENT, server.almanac_api) == server.submit_url
+    assert snapshot.lookup(AGENT, "https://other.almanac/v1/almanac") is None
+    assert snapshot.lookup("agent1qunknown", server.almanac_api) is None
+
+
+def test_snapshot_is_readable_by_other_users(snapshot_path):
+    path, _ = snapshot_path
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+
+def test_expired_snapshot_answers_nothing(snapshot_path):
+    path, server = snapshot_path
+    snapshot = AlmanacSnapshot(path, max_age=0)
+    assert snapshot.lookup(AGENT, server.almanac_api) is None
+
+
+def test_missing_default_snapshot_falls_back_to_network(
+    tmp_path, monkeypatch, default_snapshot
+):
+    monkeypatch.setenv(SNAPSHOT_ENV_VAR, str(tmp_path / "missing.db"))
+
+    assert get_default_almanac_snapshot() is None
+    # the missing file is only reported once
+    assert almanac._default_snapshot_loaded
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_forked_child_reconnects(snapshot_path):
+    path, server = snapshot_path
+    snapshot = AlmanacSnapshot(path)
+    parent_connection = snapshot._connection
+
+    pid = os.fork()
+    if pid == 0:
+        ok = (
+            snapshot._connection is not parent_connection
+            and snapshot.lookup(AGENT, server.almanac_api) == server.submit_url
+        )
+        os._exit(0 if ok else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert snapshot._connection is parent_connection
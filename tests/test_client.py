@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import httpx
+import pytest
+
+from benchmarks.mock_agentverse import MockAgentverse
+from fetchai.client import AgentClient, ReplyTimeout
+from fetchai.communication import _conversations
+from fetchai.crypto import Identity
+from fetchai.host import AgentHost, _ThreadingWSGIServer
+
+SEED = "agent client test seed"
+CLIENT = Identity.from_seed(SEED, 0)
+ECHO = Identity.from_seed(SEED, 1)
+MUTE = Identity.from_seed(SEED, 2)
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    with MockAgentverse() as server:
+        host = AgentHost(almanac_api=server.almanac_api)
+        host.add_agent(CLIENT)
+        host.add_agent(ECHO, lambda message: host.reply(message, message.payload))
+        host.add_agent(MUTE, lambda message: None)
+
+        httpd = make_server(
+            "127.0.0.1",
+            0,
+            host,
+            server_class=_ThreadingWSGIServer,
+            handler_class=_QuietHandler,
+        )
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://127.0.0.1:{httpd.server_port}/"
+        for identity in (CLIENT, ECHO, MUTE):
+            httpx.post(
+                f"{server.almanac_api}/agents",
+                json={
+                    "agent_address": identity.address,
+                    "endpoints": [{"url": url, "weight": 1}],
+                },
+            ).raise_for_status()
+        server.reset_stats()
+
+        yield server
+
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_ask_returns_reply(server):
+    async def _main():
+        async with AgentClient(CLIENT, almanac_api=server.almanac_api) as client:
+            replies = await asyncio.gather(
+                *[client.ask(ECHO.address, {"n": n}, timeout=10) for n in range(20)]
+            )
+            assert client.pending == 0
+        return replies
+
+    replies = asyncio.run(_main())
+
+    assert [reply.payload for reply in replies] == [{"n": n} for n in range(20)]
+    assert all(reply.sender == ECHO.address for reply in replies)
+
+
+def test_ask_times_out_without_reply(server):
+    async def _main():
+        async with AgentClient(CLIENT, almanac_api=server.almanac_api) as client:
+            results = await asyncio.gather(
+                *[client.ask(MUTE.address, {"n": n}, timeout=0.2) for n in range(5)],
+                return_exceptions=True,
+            )
+            assert client.pending == 0
+        return results
+
+    results = asyncio.run(_main())
+
+    assert all(isinstance(result, ReplyTimeout) for result in results)
+    assert {result.target for result in results} == {MUTE.address}
+    assert all(result.timeout == 0.2 for result in results)
+    assert not any(result.session in _conversations for result in results)
+    # the endpoint of the target is looked up once and then cached
+    assert server.requests["almanac.lookup"] == 1
+
+
+def test_failed_send_removes_pending_request(server):
+    async def _main():
+        async with AgentClient(
+            CLIENT, almanac_api=f"{server.url}/missing", timeout=10
+        ) as client:
+            with pytest.raises(httpx.HTTPError):
+                await client.ask(ECHO.address, {"n": 1})
+            assert client.pending == 0
+
+    asyncio.run(_main())
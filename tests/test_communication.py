@@ -0,0 +1,84 @@
+import base64
+import gzip
+import io
+import json
+from uuid import uuid4
+
+import pytest
+
+from fetchai.communication import _build_envelope, _compress, _decompress
+from fetchai.crypto import Identity
+from fetchai.host import AgentHost
+
+SEED = "communication test seed"
+SENDER = Identity.from_seed(SEED, 0)
+TARGET = Identity.from_seed(SEED, 1)
+
+DATA = b'{"text": "hello"}' * 100
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_compressed_payload_round_trips(compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    assert _decompress(_compress(DATA, compression), len(DATA)) == DATA
+
+
+def test_uncompressed_payload_is_returned_as_is():
+    assert _decompress(DATA, 10) == DATA
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"\x1f\x8bgarbage",
+        gzip.compress(DATA)[:-12],
+        gzip.compress(DATA)[:20],
+    ],
+    ids=["corrupt", "truncated", "header-only"],
+)
+def test_invalid_gzip_payload_is_rejected(data):
+    with pytest.raises(ValueError, match="Invalid gzip payload"):
+        _decompress(data, len(DATA))
+
+
+def test_invalid_zstd_payload_is_rejected():
+    pytest.importorskip("zstandard")
+    with pytest.raises(ValueError, match="Invalid zstd payload"):
+        _decompress(b"\x28\xb5\x2f\xfdgarbage", len(DATA))
+    with pytest.raises(ValueError, match="Invalid zstd payload"):
+        _decompress(_compress(DATA, "zstd")[:-3], len(DATA))
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_payload_expanding_beyond_max_size_is_rejected(compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    bomb = _compress(b"\0" * (10 * 1024 * 1024), compression)
+    assert len(bomb) < 64 * 1024
+
+    with pytest.raises(ValueError, match="exceeds 1024 bytes"):
+        _decompress(bomb, 1024)
+
+
+def test_host_answers_corrupt_payload_with_400():
+    host = AgentHost()
+    host.add_agent(TARGET, lambda message: message.payload)
+
+    env = _build_envelope(SENDER, TARGET.address, {"text": "hi"}, uuid4(), None, None)
+    env.payload = base64.b64encode(b"\x1f\x8bgarbage").decode()
+    env.sign(SENDER)
+    content = env.model_dump_json().encode()
+
+    statuses = []
+    response = host(
+        {
+            "REQUEST_METHOD": "POST",
+            "CONTENT_LENGTH": str(len(content)),
+            "wsgi.input": io.BytesIO(content),
+        },
+        lambda status, headers: statuses.append(status),
+    )
+
+    assert statuses == ["400 Bad Request"]
+    assert "Invalid gzip payload" in json.loads(b"".join(response))["error"]
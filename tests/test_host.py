@@ -0,0 +1,40 @@
+import io
+import json
+
+from fetchai.host import AgentHost
+from fetchai.inbound import InboundPipeline
+
+
+class _UnreadableInput(io.RawIOBase):
+    def read(self, size=-1):
+        raise AssertionError("body read before the size check")
+
+
+def _post(host: AgentHost, body, length: int):
+    statuses = []
+    response = host(
+        {
+            "REQUEST_METHOD": "POST",
+            "CONTENT_LENGTH": str(length),
+            "wsgi.input": body,
+        },
+        lambda status, headers: statuses.append(status),
+    )
+    return statuses[0], json.loads(b"".join(response))
+
+
+def test_oversized_envelope_is_rejected_before_reading():
+    host = AgentHost(pipeline=InboundPipeline(max_size=1024))
+
+    status, body = _post(host, _UnreadableInput(), 10 * 1024 * 1024 * 1024)
+
+    assert status == "413 Payload Too Large"
+    assert "exceeds 1024 bytes" in body["error"]
+
+
+def test_envelope_within_size_limit_is_read():
+    host = AgentHost(pipeline=InboundPipeline(max_size=1024))
+
+    status, body = _post(host, io.BytesIO(b"not json"), 8)
+
+    assert status == "400 Bad Request"
@@ -0,0 +1,27 @@
+import pytest
+
+from fetchai.inbound import InboundEnvelope, InboundPipeline, MessageRejected
+
+
+def test_size_counts_bytes():
+    assert InboundEnvelope('{"a": "é"}').size == len('{"a": "é"}'.encode())
+    assert InboundEnvelope(b'{"a": 1}').size == 8
+
+
+def test_size_limit_applies_to_encoded_str():
+    pipeline = InboundPipeline(max_size=10)
+    with pytest.raises(MessageRejected) as info:
+        # 8 characters, 16 bytes
+        pipeline.process('"éééééé"')
+    assert info.value.stage == "size_limit"
+
+
+@pytest.mark.parametrize("content", ["not json", b"\xff\xfe", "[1, 2]"])
+def test_invalid_json_is_rejected_by_json_stage(content):
+    pipeline = InboundPipeline()
+    with pytest.raises(MessageRejected) as info:
+        pipeline.process(content)
+
+    assert info.value.stage == "json"
+    assert pipeline.stats["json"]["rejected"] == 1
+    assert pipeline.stats["expiry"]["rejected"] == 0
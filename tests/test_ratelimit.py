@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+
+from fetchai.ratelimit import RateLimiter, TokenBucket
+
+
+def test_reserve_is_immediate_within_capacity():
+    bucket = TokenBucket(10.0)
+    assert [bucket.reserve() for _ in range(10)] == [0.0] * 10
+    assert bucket.reserve() > 0
+
+
+def test_reserve_delays_after_throttle():
+    bucket = TokenBucket(10.0)
+    bucket.throttle(2.0)
+
+    delays = [bucket.reserve() for _ in range(4)]
+
+    # the first waiter goes when the block ends, the others follow one by one
+    # at the halved rate instead of all at once
+    assert delays[0] == pytest.approx(2.0, abs=0.05)
+    for previous, delay in zip(delays, delays[1:]):
+        assert delay - previous == pytest.approx(1 / 5, abs=0.05)
+    assert bucket.rate == 5.0
+
+
+def test_reserve_delays_after_throttle_without_rate():
+    bucket = TokenBucket(None)
+    bucket.throttle(1.0)
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+
+
+def test_succeed_recovers_rate():
+    bucket = TokenBucket(10.0, recovery=0.5)
+    bucket.throttle(0.0)
+    assert bucket.rate == 5.0
+    bucket.succeed()
+    bucket.succeed()
+    assert bucket.rate == 10.0
+
+
+def test_acquire_waits_for_throttle_during_sleep():
+    bucket = TokenBucket(100.0, capacity=1.0)
+    bucket.acquire()
+
+    async def _acquire() -> float:
+        start = time.monotonic()
+        await bucket.acquire_async()
+        return time.monotonic() - start
+
+    async def _main() -> float:
+        waiter = asyncio.ensure_future(_acquire())
+        await asyncio.sleep(0)
+        # a 429 arrives while the waiter sleeps for its token
+        bucket.throttle(0.2)
+        return await waiter
+
+    assert asyncio.run(_main()) >= 0.2
+
+
+def test_rate_limiter_shares_buckets_per_route():
+    limiter = RateLimiter({"http://almanac/": 10.0})
+    assert limiter.bucket("http://almanac/agents/agent1qabc") is limiter.bucket(
+        "http://almanac/agents/agent1qdef"
+    )
+    assert limiter.bucket("http://almanac/agents/agent1qabc").rate == 10.0
+    assert limiter.bucket("http://other/submit").rate is None
+
+
+def test_rate_limiter_keeps_most_recent_buckets():
+    limiter = RateLimiter(max_buckets=2)
+    first = limiter.bucket("http://a/submit")
+    limiter.bucket("http://b/submit")
+    limiter.bucket("http://a/submit")
+    limiter.bucket("http://c/submit")
+
+    assert limiter.bucket("http://a/submit") is first
+    assert len(limiter._buckets) == 2
+
+
+def test_rate_limiter_has_no_fixed_rates_by_default():
+    limiter = RateLimiter()
+    assert limiter.bucket("https://agentverse.ai/v1/agents/").rate is None
+    assert limiter.bucket("https://agentverse.ai/v1/search/agents").rate is None
+
+
+def test_only_successful_responses_recover_the_rate():
+    limiter = RateLimiter({"http://a/": 10.0})
+    bucket = limiter.bucket("http://a/submit")
+    bucket.throttle(0.0)
+
+    for status_code in (500, 502, 404):
+        assert not limiter.update("http://a/submit", status_code, {})
+    assert bucket.rate == 5.0
+
+    limiter.update("http://a/submit", 200, {})
+    assert bucket.rate > 5.0
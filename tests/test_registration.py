@@ -0,0 +1,86 @@
+from benchmarks.mock_agentverse import MockAgentverse
+from fetchai.communication import lookup_endpoint_for_agent
+from fetchai.crypto import Identity
+from fetchai.registration import (
+    register_batch_with_agentverse,
+    register_with_agentverse,
+)
+
+SEED = "registration test seed"
+URL = "http://127.0.0.1:8000/webhook"
+
+
+def _agents(count: int):
+    for index in range(count):
+        yield Identity.from_seed(SEED, index), f"Test AI {index}", "<readme/>"
+
+
+def test_batch_registration_submits_attestations_in_batches():
+    with MockAgentverse() as server:
+        failures = register_batch_with_agentverse(
+            _agents(25),
+            URL,
+            "token",
+            almanac_api=server.almanac_api,
+            mailbox_api=server.mailbox_api,
+            batch_size=10,
+        )
+
+        assert failures == {}
+        assert server.requests["almanac.register_batch"] == 3
+        assert server.requests["almanac.register"] == 0
+        assert server.requests["agents.create"] == 25
+        assert server.requests["agents.update"] == 25
+        address = Identity.from_seed(SEED, 24).address
+        assert lookup_endpoint_for_agent(address, almanac_api=server.almanac_api) == URL
+
+
+def test_failed_batch_fails_every_agent_of_the_batch():
+    with MockAgentverse() as server:
+        failures = register_batch_with_agentverse(
+            _agents(3),
+            URL,
+            "token",
+            almanac_api=f"{server.url}/missing",
+            mailbox_api=server.mailbox_api,
+        )
+
+        assert set(failures) == {identity.address for identity, _, _ in _agents(3)}
+        assert server.requests["agents.create"] == 0
+
+
+def _register(server: MockAgentverse, previous_readme_digest=None):
+    return register_with_agentverse(
+        Identity.from_seed(SEED, 0),
+        URL,
+        "token",
+        "Test AI",
+        "<readme/>",
+        almanac_api=server.almanac_api,
+        mailbox_api=server.mailbox_api,
+        previous_readme_digest=previous_readme_digest,
+    )
+
+
+def test_unchanged_readme_is_not_uploaded_again():
+    with MockAgentverse() as server:
+        first = _register(server)
+        second = _register(server, first.readme_digest)
+
+        assert first.readme_uploaded
+        assert not second.readme_uploaded
+        assert second.readme_digest == first.readme_digest
+        assert server.requests["agents.update"] == 1
+
+
+def test_readme_is_uploaded_for_recreated_agent():
+    with MockAgentverse() as server:
+        digest = _register(server).readme_digest
+
+    # a new Agentverse knows nothing of the agent
+    with MockAgentverse() as server:
+        result = _register(server, digest)
+
+        assert result.readme_uploaded
+        assert server.requests["agents.create"] == 1
+        assert server.requests["agents.update"] == 1
@@ -0,0 +1,70 @@
+import hashlib
+
+import pytest
+from pydantic import BaseModel
+from pydantic.v1 import BaseModel as BaseModelV1
+
+from fetchai import schema
+from fetchai.schema import ModelRegistry, compute_model_digest
+
+
+class Request(BaseModelV1):
+    text: str
+
+
+class Reply(BaseModel):
+    text: str
+    score: int
+
+
+# uAgents digests the schema_json(indent=None, sort_keys=True) of its models
+REQUEST_SCHEMA = (
+    '{"properties": {"text": {"title": "Text", "type": "string"}}, '
+    '"required": ["text"], "title": "Request", "type": "object"}'
+)
+REQUEST_DIGEST = (
+    "model:ecc2d29b13e59b2799501d757769dab8f189d69dee76969e82c8bb36c1cf4ffe"
+)
+
+
+def test_pydantic_v1_digest_matches_uagents():
+    assert Request.schema_json(indent=None, sort_keys=True) == REQUEST_SCHEMA
+    assert (
+        REQUEST_DIGEST == f"model:{hashlib.sha256(REQUEST_SCHEMA.encode()).hexdigest()}"
+    )
+    assert compute_model_digest(Request) == REQUEST_DIGEST
+
+
+def test_non_model_has_no_digest():
+    with pytest.raises(ValueError):
+        compute_model_digest(dict)
+
+
+@pytest.mark.parametrize(
+    "model, payload",
+    [(Request, '{"text":"hi"}'), (Reply, '{"text":"hi","score":3}')],
+)
+def test_registered_payload_decodes_in_a_single_pass(model, payload, monkeypatch):
+    registry = ModelRegistry()
+    digest = compute_model_digest(model)
+    registry.register(model)
+
+    # the payload must be validated straight from JSON, never parsed to a dict first
+    def _no_loads(*args, **kwargs):
+        raise AssertionError("payload parsed before validation")
+
+    monkeypatch.setattr(schema.json, "loads", _no_loads)
+
+    decoded = registry.decode(digest, payload)
+    assert isinstance(decoded, model)
+    assert decoded.text == "hi"
+
+
+def test_unregistered_payload_decodes_to_json():
+    assert ModelRegistry().decode(REQUEST_DIGEST, '{"text":"hi"}') == {"text": "hi"}
+
+
+def test_encode_uses_digest_of_model():
+    registry = ModelRegistry()
+    assert registry.encode(Request(text="hi")) == ('{"text":"hi"}', REQUEST_DIGEST)
+    assert registry.encode({"text": "hi"}) == ('{"text":"hi"}', None)
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from benchmarks.mock_agentverse import MockAgentverse
+from benchmarks.scenarios import BENCHMARK_PAYLOAD, BENCHMARK_SEED
+from fetchai.crypto import Identity
+from fetchai import sender as sender_module
+from fetchai.sender import PipelinedSender
+
+SENDER = Identity.from_seed(BENCHMARK_SEED, 0)
+OTHER_SENDER = Identity.from_seed(BENCHMARK_SEED, 2)
+TARGET = Identity.from_seed(BENCHMARK_SEED, 1).address
+
+
+@pytest.fixture
+def server():
+    # slow enough responses that messages are still queued when close() is called
+    with MockAgentverse(latency=0.005) as server:
+        yield server
+
+
+def test_close_delivers_every_accepted_message(server):
+    with ThreadPoolExecutor(2) as signing_pool:
+        sender = PipelinedSender(
+            signing_pool=signing_pool, concurrency=4, almanac_api=server.almanac_api
+        )
+        futures = [sender.submit(SENDER, TARGET, BENCHMARK_PAYLOAD) for _ in range(50)]
+        sender.close()
+
+    assert all(future.done() for future in futures)
+    assert [future.result() for future in futures] == [None] * 50
+    assert server.requests["submit"] == 50
+    # the endpoint of the target is looked up once and then cached
+    assert server.requests["almanac.lookup"] == 1
+
+
+def test_submit_after_close_fails(server):
+    with ThreadPoolExecutor(1) as signing_pool:
+        sender = PipelinedSender(
+            signing_pool=signing_pool, almanac_api=server.almanac_api
+        )
+        sender.close()
+        with pytest.raises(ValueError):
+            sender.submit(SENDER, TARGET, BENCHMARK_PAYLOAD)
+
+
+def test_failed_lookup_fails_the_future(server):
+    with ThreadPoolExecutor(1) as signing_pool:
+        with PipelinedSender(
+            signing_pool=signing_pool, almanac_api=f"{server.url}/missing"
+        ) as sender:
+            future = sender.submit(SENDER, TARGET, BENCHMARK_PAYLOAD)
+            with pytest.raises(httpx.HTTPError):
+                future.result(timeout=10)
+
+    assert server.requests["submit"] == 0
+
+
+class _RecordingExecutor(ThreadPoolExecutor):
+    """Records the arguments of every task, as they would be sent to a worker."""
+
+    def __init__(self):
+        super().__init__(1)
+        self.calls = []
+
+    def submit(self, fn, *args, **kwargs):
+        self.calls.append(args)
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_private_key_is_sent_once(server, monkeypatch):
+    monkeypatch.setattr(sender_module, "_worker_identities", {})
+
+    with _RecordingExecutor() as signing_pool:
+        with PipelinedSender(
+            signing_pool=signing_pool, almanac_api=server.almanac_api
+        ) as sender:
+            # the first message registers the sender with the worker
+            sender.submit(SENDER, TARGET, BENCHMARK_PAYLOAD).result(timeout=10)
+            futures = [
+                sender.submit(SENDER, TARGET, BENCHMARK_PAYLOAD) for _ in range(10)
+            ]
+            [future.result(timeout=10) for future in futures]
+
+    with_key = [args for args in signing_pool.calls if SENDER.private_key in args]
+    assert len(with_key) == 1
+    # one miss of the unregistered sender, then only addresses
+    assert len(signing_pool.calls) == 12
+
+
+def test_signing_processes_know_registered_senders(server):
+    with PipelinedSender(
+        workers=2, senders=[SENDER], almanac_api=server.almanac_api
+    ) as sender:
+        futures = [
+            sender.submit(identity, TARGET, BENCHMARK_PAYLOAD)
+            for identity in (SENDER, OTHER_SENDER) * 5
+        ]
+
+    assert [future.result() for future in futures] == [None] * 10
+    assert server.requests["submit"] == 10